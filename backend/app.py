@@ -1,35 +1,43 @@
-from flask import Flask, request, jsonify, send_from_directory
-from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
-import uuid
-from datetime import datetime
-import os
+"""
+Care_4_U Hospitals - production entry point
+
+Serves the API (see application.py) and the frontend on DynamoDB, with
+confirmation emails published to SNS. Set STORAGE_BACKEND to run the same
+app on another backend (see repository.py).
+
+In production run it under gunicorn (see gunicorn.conf.py):
+
+    gunicorn -c gunicorn.conf.py
+
+`python app.py` starts Flask's single-process development server instead
+(FLASK_DEBUG=1 for the debugger and reloader).
+"""
 
 import os
+import threading
 
-# Get the path to the frontend directory
-frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
+from application import create_app
+from aws_clients import AWS_REGION, LazyProxy, get_client
+from notifications import SnsTransport
+from repository import create_repository
+from seed_doctors import load_doctor_data
 
-app = Flask(__name__, 
-            static_folder=frontend_dir,
-            static_url_path='',
-            template_folder=frontend_dir)
-CORS(app)
+# Get the path to the frontend directory; serve its production build
+# (see build_assets.py) when there is one
+frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'frontend')
+if os.path.isfile(os.path.join(frontend_dir, 'dist', 'index.html')):
+    frontend_dir = os.path.join(frontend_dir, 'dist')
 
 # AWS Configuration - Uses IAM role credentials from EC2
-# No hardcoded credentials needed
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-sns_client = boto3.client('sns', region_name='us-east-1')
-
-# DynamoDB Tables
-users_table = dynamodb.Table('Care4U_Users')
-doctors_table = dynamodb.Table('Care4U_Doctors')
-appointments_table = dynamodb.Table('Care4U_Appointments')
+# No hardcoded credentials needed. Clients come from the shared factory in
+# aws_clients.py (pool size, retries, timeouts, local endpoints).
+sns_client = LazyProxy(lambda: get_client('sns'))
 
 # SNS Topic ARN - Update this with your actual SNS topic ARN after creation
-SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:892485120480:Care4U_Appointments')
+SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN', f'arn:aws:sns:{AWS_REGION}:892485120480:Care4U_Appointments')
+
+repository = create_repository(os.environ.get('STORAGE_BACKEND', 'dynamodb'))
+app = create_app(repository, SnsTransport(sns_client, SNS_TOPIC_ARN), frontend_dir=frontend_dir)
 
 
 # ============================================
@@ -38,41 +46,31 @@ SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN', 'arn:aws:sns:us-east-1:892485120
 
 def seed_doctors_if_empty():
     """
-    Automatically seed doctors data if the Care4U_Doctors table is empty.
-    This runs on application startup to eliminate manual data entry.
+    Automatically seed doctors data if there are no doctors yet.
+    This runs on application startup (see seed_doctors_in_background) to
+    eliminate manual data entry. The emptiness check reads at most one
+    doctor; seeding uses parallel batch writes on DynamoDB (see seed_doctors.py).
     """
     try:
         # Check if doctors table is empty
-        response = doctors_table.scan()
-        
-        if response['Count'] == 0:
+        doctors, _ = repository.search_doctors(limit=1)
+        if not doctors:
             print("\n" + "="*60)
             print("📋 Doctors table is empty. Auto-seeding doctor data...")
             print("="*60)
             
             # Load doctor data from JSON file
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            json_path = os.path.join(script_dir, 'local_data', 'doctors.json')
-            
-            with open(json_path, 'r') as f:
-                doctors = json.load(f)
+            doctors = load_doctor_data()
             
-            # Insert each doctor
-            success_count = 0
-            for doctor in doctors:
-                try:
-                    doctors_table.put_item(Item=doctor)
-                    print(f"  ✓ Added: Dr. {doctor['name']} ({doctor['specialization']})")
-                    success_count += 1
-                except Exception as e:
-                    print(f"  ✗ Failed to add Dr. {doctor['name']}: {str(e)}")
+            success_count = repository.put_doctors(doctors)
+            app.extensions['care4u'].doctors_cache.invalidate()
             
             print("="*60)
             print(f"✅ Auto-seeding complete: {success_count}/{len(doctors)} doctors added")
             print("="*60 + "\n")
         else:
-            print(f"✓ Doctors table already populated with {response['Count']} doctors")
-            
+            print("✓ Doctors table already populated")
+    
     except FileNotFoundError:
         print("⚠️  Warning: doctors.json file not found. Skipping auto-seeding.")
     except Exception as e:
@@ -80,345 +78,25 @@ def seed_doctors_if_empty():
         print("   You may need to seed doctors manually or check your DynamoDB permissions.")
 
 
-# ============================================
-# AUTHENTICATION ENDPOINTS
-# ============================================
-
-@app.route('/signup', methods=['POST'])
-def signup():
+def seed_doctors_in_background():
     """
-    User registration endpoint
-    Expected JSON: {name, email, phone, password}
+    Run seed_doctors_if_empty() on its own thread, so the server starts
+    serving at once. The thread is not a daemon: shutting down waits for
+    a seeding in progress instead of leaving the table half-filled.
     """
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['name', 'email', 'phone', 'password']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
-        
-        email = data['email'].lower().strip()
-        
-        # Check if email already exists
-        try:
-            response = users_table.scan(
-                FilterExpression=Attr('email').eq(email)
-            )
-            if response['Items']:
-                return jsonify({
-                    'success': False,
-                    'error': 'Email already registered'
-                }), 409
-        except Exception as e:
-            print(f"Error checking email: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': 'Database error'
-            }), 500
-        
-        # Generate user ID and hash password
-        user_id = str(uuid.uuid4())
-        password_hash = generate_password_hash(data['password'], method='pbkdf2:sha256')
-        
-        # Store user in DynamoDB
-        users_table.put_item(
-            Item={
-                'user_id': user_id,
-                'name': data['name'],
-                'email': email,
-                'phone': data['phone'],
-                'password_hash': password_hash
-            }
-        )
-        
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'message': 'User registered successfully'
-        }), 201
-        
-    except Exception as e:
-        print(f"Signup error: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error'
-        }), 500
-
-
-@app.route('/login', methods=['POST'])
-def login():
-    """
-    User login endpoint
-    Expected JSON: {email, password}
-    """
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        if not data.get('email') or not data.get('password'):
-            return jsonify({
-                'success': False,
-                'error': 'Email and password are required'
-            }), 400
-        
-        email = data['email'].lower().strip()
-        
-        # Find user by email
-        response = users_table.scan(
-            FilterExpression=Attr('email').eq(email)
-        )
-        
-        if not response['Items']:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid email or password'
-            }), 401
-        
-        user = response['Items'][0]
-        
-        # Verify password
-        if not check_password_hash(user['password_hash'], data['password']):
-            return jsonify({
-                'success': False,
-                'error': 'Invalid email or password'
-            }), 401
-        
-        return jsonify({
-            'success': True,
-            'user_id': user['user_id'],
-            'name': user['name'],
-            'email': user['email'],
-            'message': 'Login successful'
-        }), 200
-        
-    except Exception as e:
-        print(f"Login error: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': 'Internal server error'
-        }), 500
-
-
-# ============================================
-# DOCTOR MANAGEMENT ENDPOINTS
-# ============================================
-
-@app.route('/doctors', methods=['GET'])
-def get_doctors():
-    """
-    Retrieve all doctors
-    Returns: List of doctors with their details
-    """
-    try:
-        response = doctors_table.scan()
-        doctors = response['Items']
-        
-        return jsonify({
-            'success': True,
-            'doctors': doctors
-        }), 200
-        
-    except Exception as e:
-        print(f"Get doctors error: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': 'Failed to retrieve doctors'
-        }), 500
-
-
-# ============================================
-# APPOINTMENT BOOKING ENDPOINTS
-# ============================================
-
-@app.route('/book-appointment', methods=['POST'])
-def book_appointment():
-    """
-    Book an appointment
-    Expected JSON: {user_id, doctor_id, date, time}
-    """
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['user_id', 'doctor_id', 'date', 'time']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
-        
-        user_id = data['user_id']
-        doctor_id = data['doctor_id']
-        appointment_date = data['date']
-        appointment_time = data['time']
-        
-        # Validate user exists
-        try:
-            user_response = users_table.get_item(Key={'user_id': user_id})
-            if 'Item' not in user_response:
-                return jsonify({
-                    'success': False,
-                    'error': 'User not found'
-                }), 404
-            user = user_response['Item']
-        except Exception as e:
-            print(f"Error fetching user: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': 'Invalid user'
-            }), 400
-        
-        # Validate doctor exists
-        try:
-            doctor_response = doctors_table.get_item(Key={'doctor_id': doctor_id})
-            if 'Item' not in doctor_response:
-                return jsonify({
-                    'success': False,
-                    'error': 'Doctor not found'
-                }), 404
-            doctor = doctor_response['Item']
-        except Exception as e:
-            print(f"Error fetching doctor: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': 'Invalid doctor'
-            }), 400
-        
-        # Check for double booking (same doctor, date, and time)
-        try:
-            existing_appointments = appointments_table.scan(
-                FilterExpression=Attr('doctor_id').eq(doctor_id) & 
-                                Attr('date').eq(appointment_date) & 
-                                Attr('time').eq(appointment_time) &
-                                Attr('status').eq('booked')
-            )
-            
-            if existing_appointments['Items']:
-                return jsonify({
-                    'success': False,
-                    'error': 'This time slot is already booked. Please select another time.'
-                }), 409
-        except Exception as e:
-            print(f"Error checking double booking: {str(e)}")
-            return jsonify({
-                'success': False,
-                'error': 'Failed to validate appointment slot'
-            }), 500
-        
-        # Create appointment
-        appointment_id = str(uuid.uuid4())
-        
-        appointments_table.put_item(
-            Item={
-                'appointment_id': appointment_id,
-                'user_id': user_id,
-                'doctor_id': doctor_id,
-                'date': appointment_date,
-                'time': appointment_time,
-                'status': 'booked',
-                'created_at': datetime.now().isoformat()
-            }
-        )
-        
-        # Send SNS notification
-        try:
-            message = f"""Dear {user['name']},
-
-Your appointment has been confirmed!
-
-Appointment Details:
-- Doctor: Dr. {doctor['name']}
-- Specialization: {doctor['specialization']}
-- Date: {appointment_date}
-- Time: {appointment_time}
-- Appointment ID: {appointment_id}
-
-Thank you for choosing Care_4_U Hospitals.
-
-Best regards,
-Care_4_U Hospitals Team"""
-
-            sns_client.publish(
-                TopicArn=SNS_TOPIC_ARN,
-                Subject='Appointment Confirmation - Care_4_U Hospitals',
-                Message=message
-            )
-            print(f"SNS notification sent for appointment {appointment_id}")
-        except Exception as e:
-            # Log error but don't fail the appointment booking
-            print(f"SNS notification error: {str(e)}")
-        
-        return jsonify({
-            'success': True,
-            'appointment_id': appointment_id,
-            'message': 'Appointment booked successfully',
-            'details': {
-                'doctor_name': doctor['name'],
-                'specialization': doctor['specialization'],
-                'date': appointment_date,
-                'time': appointment_time
-            }
-        }), 201
-        
-    except Exception as e:
-        print(f"Book appointment error: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': 'Failed to book appointment'
-        }), 500
-
-
-# ============================================
-# UTILITY ENDPOINTS
-# ============================================
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'Care_4_U Hospitals API'
-    }), 200
-
-
-@app.route('/', methods=['GET'])
-def home():
-    """Root endpoint - Serves frontend"""
-    return send_from_directory(frontend_dir, 'index.html')
-
-
-# ============================================
-# ERROR HANDLERS
-# ============================================
-
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
-        'success': False,
-        'error': 'Endpoint not found'
-    }), 404
-
-
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({
-        'success': False,
-        'error': 'Internal server error'
-    }), 500
+    thread = threading.Thread(target=seed_doctors_if_empty, name='seed-doctors')
+    thread.start()
+    return thread
 
 
 if __name__ == '__main__':
     # Auto-seed doctors data if table is empty
     print("\n🏥 Starting Care_4_U Hospitals Application...")
-    seed_doctors_if_empty()
+    print(f"💾 Storage: {repository.name}")
+    seed_doctors_in_background()
     
     # Run on all interfaces so it's accessible from outside EC2
-    print("🚀 Starting Flask server on http://0.0.0.0:5000")
+    print("🚀 Starting Flask development server on http://0.0.0.0:5000")
+    print("   For production use: gunicorn -c gunicorn.conf.py")
     print("="*60 + "\n")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG') == '1')
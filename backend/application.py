@@ -0,0 +1,1270 @@
+"""
+Care_4_U Hospitals API, shared by every storage backend
+
+create_app() builds the Flask app over a Repository (see repository.py)
+and a notification transport; app.py (DynamoDB + SNS) and app_local.py
+(local files + console emails) are thin entry points around it. Each
+route is written once here, so caching, batching and indexing work is
+done once and behaves the same on every backend.
+
+    NOTIFICATION_WORKERS            background notification threads (default: 2)
+    BOOKING_LOOKUP_WORKERS          threads reading a booking's doctor and slot in parallel,
+                                    0 = read them in the request thread (default: 8)
+    USER_CACHE_SIZE                 user profiles kept in memory (default: 10000)
+    DOCTORS_CACHE_TTL               seconds the server keeps the doctor list (default: 300)
+    DOCTORS_MAX_AGE                 seconds browsers may reuse it (default: 60)
+    LOGIN_RATE_LIMIT_BURST          login attempts per email at once (default: 5)
+    LOGIN_RATE_LIMIT_PER_MINUTE     then this many per minute (default: 5)
+    RATE_LIMIT_IP_BURST             auth and booking requests per client address at once (default: 30)
+    RATE_LIMIT_IP_PER_MINUTE        then this many per minute, 0 = no limit (default: 60)
+    RATE_LIMIT_USER_BURST           booking requests per logged-in user at once (default: 10)
+    RATE_LIMIT_USER_PER_MINUTE      then this many per minute, 0 = no limit (default: 30)
+    RATE_LIMIT_GLOBAL_BURST         auth and booking requests across all clients at once (default: 200)
+    RATE_LIMIT_GLOBAL_PER_SECOND    then this many per second, 0 = no limit (default: 0)
+    SHED_MAX_IN_FLIGHT              auth and booking requests handled at once per process,
+                                    0 = no limit (default: 64)
+    SHED_LATENCY_MS                 shed an endpoint's load while its average latency is above this,
+                                    0 = never (default: 2000)
+    SHED_QUEUE_DEPTH                shed load while this many notifications and waitlist
+                                    promotions are queued, 0 = never (default: 5000)
+    TRUSTED_PROXY_COUNT             proxies in front of the app whose X-Forwarded-For
+                                    gives the client address (default: 0)
+
+Rate limit buckets are kept per process unless RATE_LIMIT_BACKEND=sqlite
+(see rate_limit.py).
+"""
+
+import atexit
+import os
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request
+from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+from werkzeug.local import LocalProxy
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from availability import free_slots, parse_date_range
+from caching import LRUCache, TTLCache, cached_json_response
+from metrics import CONTENT_TYPE, Metrics
+from notifications import (NotificationDispatcher, appointment_cancellation, appointment_confirmation,
+                           appointment_rescheduled, waitlist_promotion)
+from pagination import decode_cursor, encode_cursor, parse_limit
+from passwords import PasswordHasher, PasswordHasherBusy
+from rate_limit import LoadShedder, TokenBucketLimiter, create_bucket_store, rate_limited_response
+from sessions import SessionManager, bearer_token, require_session
+from static_assets import register_frontend
+from waitlist import WaitlistPromoter, waitlist_position
+
+# Confirmation emails are published by background workers
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', '2'))
+
+# Threads shared by all requests for the lookups a booking makes in parallel
+BOOKING_LOOKUP_WORKERS = int(os.environ.get('BOOKING_LOOKUP_WORKERS', '8'))
+
+# Login attempts per email: a burst of LOGIN_RATE_LIMIT_BURST, then
+# LOGIN_RATE_LIMIT_PER_MINUTE, so brute force cannot exhaust hashing CPU
+LOGIN_RATE_LIMIT_BURST = int(os.environ.get('LOGIN_RATE_LIMIT_BURST', '5'))
+LOGIN_RATE_LIMIT_PER_MINUTE = float(os.environ.get('LOGIN_RATE_LIMIT_PER_MINUTE', '5'))
+
+# Auth and booking requests per client address, per logged-in user and in
+# total (token buckets: a burst, then a steady rate), so one client cannot
+# crowd out the others
+RATE_LIMIT_IP_BURST = int(os.environ.get('RATE_LIMIT_IP_BURST', '30'))
+RATE_LIMIT_IP_PER_MINUTE = float(os.environ.get('RATE_LIMIT_IP_PER_MINUTE', '60'))
+RATE_LIMIT_USER_BURST = int(os.environ.get('RATE_LIMIT_USER_BURST', '10'))
+RATE_LIMIT_USER_PER_MINUTE = float(os.environ.get('RATE_LIMIT_USER_PER_MINUTE', '30'))
+RATE_LIMIT_GLOBAL_BURST = int(os.environ.get('RATE_LIMIT_GLOBAL_BURST', '200'))
+RATE_LIMIT_GLOBAL_PER_SECOND = float(os.environ.get('RATE_LIMIT_GLOBAL_PER_SECOND', '0'))
+
+# Load shedding: auth and booking requests are refused with 503 rather than
+# queued while the process is overloaded
+SHED_MAX_IN_FLIGHT = int(os.environ.get('SHED_MAX_IN_FLIGHT', '64'))
+SHED_LATENCY_MS = float(os.environ.get('SHED_LATENCY_MS', '2000'))
+SHED_QUEUE_DEPTH = int(os.environ.get('SHED_QUEUE_DEPTH', '5000'))
+
+# Endpoints the rate limits and load shedding apply to
+ADMISSION_CONTROLLED_ENDPOINTS = {
+    'api.signup', 'api.login', 'api.book_appointment', 'api.book_appointments_batch',
+    'api.cancel_appointment', 'api.reschedule_appointment', 'api.join_slot_waitlist',
+    'api.leave_slot_waitlist'
+}
+
+# Reverse proxies (nginx, a load balancer) in front of the app
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
+# LRU cache of user profiles, so authenticated requests skip the users store
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+
+# Most appointments per /appointments/batch request
+MAX_BATCH_BOOKINGS = 50
+
+# Doctor catalog cache: how long the server keeps the list (seconds) and
+# how long browsers may reuse it before revalidating with its ETag
+DOCTORS_CACHE_TTL = int(os.environ.get('DOCTORS_CACHE_TTL', '300'))
+DOCTORS_MAX_AGE = int(os.environ.get('DOCTORS_MAX_AGE', '60'))
+
+SERVICE_NAME = 'Care_4_U Hospitals API'
+
+
+# ============================================
+# APPLICATION FACTORY
+# ============================================
+
+# Every route is registered on this blueprint
+api = Blueprint('api', __name__)
+
+# The current app's services, for use inside requests
+services = LocalProxy(lambda: current_app.extensions['care4u'])
+repository = LocalProxy(lambda: services.repository)
+notification_dispatcher = LocalProxy(lambda: services.notification_dispatcher)
+waitlist_promoter = LocalProxy(lambda: services.waitlist_promoter)
+sessions = LocalProxy(lambda: services.sessions)
+
+
+class Services:
+    """The repository and the shared helpers one app instance runs on"""
+
+    def __init__(self, repository, notification_transport):
+        # Storage, notification and hashing calls are timed (see metrics.py)
+        self.metrics = Metrics()
+        repository.register_metrics(self.metrics)
+        self.repository = self.metrics.instrument(repository, 'storage')
+        self.notification_dispatcher = NotificationDispatcher(
+            self.metrics.instrument(notification_transport, 'notifications'), workers=NOTIFICATION_WORKERS)
+        # Released slots are offered to their waitlists by a background worker
+        self.waitlist_promoter = WaitlistPromoter(self.promote_from_waitlist)
+        # Password hashing runs in a bounded process pool (see passwords.py)
+        self.password_hasher = self.metrics.instrument(PasswordHasher(), 'password_hasher')
+        # Rate limits share one bucket store (see rate_limit.py)
+        bucket_store = create_bucket_store()
+        self.login_limiter = TokenBucketLimiter(LOGIN_RATE_LIMIT_BURST, LOGIN_RATE_LIMIT_PER_MINUTE / 60,
+                                                store=bucket_store, name='login')
+        self.ip_limiter = TokenBucketLimiter(RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE / 60,
+                                             store=bucket_store, name='ip')
+        self.user_limiter = TokenBucketLimiter(RATE_LIMIT_USER_BURST, RATE_LIMIT_USER_PER_MINUTE / 60,
+                                               store=bucket_store, name='user')
+        self.global_limiter = TokenBucketLimiter(RATE_LIMIT_GLOBAL_BURST, RATE_LIMIT_GLOBAL_PER_SECOND,
+                                                 store=bucket_store, name='global')
+        # Set once the missing TRUSTED_PROXY_COUNT has been reported
+        self.proxy_warning_shown = False
+        # Signed session tokens issued at login (see sessions.py)
+        self.sessions = SessionManager()
+        self.user_profiles = LRUCache(USER_CACHE_SIZE)
+        self.doctors_cache = TTLCache(DOCTORS_CACHE_TTL)
+        # Threads start on first use, so a forked worker gets its own
+        self.lookup_executor = ThreadPoolExecutor(
+            max_workers=BOOKING_LOOKUP_WORKERS, thread_name_prefix='booking-lookup'
+        ) if BOOKING_LOOKUP_WORKERS > 0 else None
+        self.metrics.add_gauge('care4u_notifications_queued', 'Notifications waiting to be delivered',
+                               self.notification_dispatcher.pending)
+        self.metrics.add_gauge('care4u_waitlist_promotions_queued', 'Released slots waiting to be offered',
+                               self.waitlist_promoter.pending)
+        self.load_shedder = LoadShedder(
+            max_in_flight=SHED_MAX_IN_FLIGHT,
+            max_latency=SHED_LATENCY_MS / 1000,
+            queue_depth=lambda: self.notification_dispatcher.pending() + self.waitlist_promoter.pending(),
+            max_queue_depth=SHED_QUEUE_DEPTH
+        )
+        self.metrics.add_gauge('care4u_admission_controlled_in_flight', 'Auth and booking requests in progress',
+                               lambda: self.load_shedder.in_flight)
+
+    def get_user_profile(self, user_id):
+        """
+        Return a user's profile, from the LRU cache when possible.
+        Login fills the cache, so a logged-in user's bookings normally
+        need no user lookup at all.
+        """
+        profile = self.user_profiles.get(user_id)
+        if profile is None:
+            user = self.repository.get_user(user_id)
+            if not user:
+                return None
+            profile = user_profile(user)
+            self.user_profiles.set(user_id, profile)
+        return profile
+
+    def booking_lookups(self, user_id, doctor_id, appointment_date, appointment_time):
+        """
+        Start the independent reads a booking needs: the user's profile, the
+        doctor, and who holds the slot. The doctor and the slot are read on
+        the lookup pool while the user is read on this thread, so a booking
+        waits for the slowest read rather than for all of them in turn.
+        Returns three futures, in that order.
+        """
+        doctor = self._start_lookup(lambda: self.repository.get_doctor(doctor_id))
+        reservation = self._start_lookup(
+            lambda: self.repository.get_reservation(doctor_id, appointment_date, appointment_time))
+        user = completed_future(lambda: self.get_user_profile(user_id))
+        return user, doctor, reservation
+
+    def _start_lookup(self, function):
+        if self.lookup_executor is None:
+            return completed_future(function)
+        return self.lookup_executor.submit(function)
+
+    def warm_up(self):
+        """
+        Load the doctor catalog into the cache, e.g. once in a server's
+        master process so every worker starts with it. An empty catalog
+        (not seeded yet) is not cached.
+        """
+        doctors = self.repository.list_doctors()
+        if doctors:
+            self.doctors_cache.get('doctors', lambda: doctors)
+
+    def promote_from_waitlist(self, doctor_id, appointment_date, appointment_time):
+        """Book a released slot for the first user on its waitlist and notify them"""
+        appointment = self.repository.promote_waitlist(doctor_id, appointment_date, appointment_time)
+        if appointment:
+            user = self.get_user_profile(appointment['user_id'])
+            doctor = self.repository.get_doctor(doctor_id)
+            if user and doctor:
+                self.notification_dispatcher.enqueue(waitlist_promotion(user, doctor, appointment))
+        return appointment
+
+    def stop(self):
+        """Finish queued background work (waitlist first, it may notify)"""
+        self.waitlist_promoter.stop()
+        self.notification_dispatcher.stop()
+        self.password_hasher.shutdown()
+        if self.lookup_executor is not None:
+            self.lookup_executor.shutdown(wait=False)
+
+
+def create_app(repository, notification_transport, frontend_dir=None):
+    """
+    Build the Flask app over a repository.
+    With frontend_dir the app also serves the frontend files (index.html
+    at /, see static_assets.py); otherwise / describes the API.
+    """
+    app = Flask(__name__, static_folder=None, template_folder=frontend_dir)
+    CORS(app)
+    if TRUSTED_PROXY_COUNT > 0:
+        # request.remote_addr is then the client's address, not the proxy's
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
+    app_services = Services(repository, notification_transport)
+    app.extensions['care4u'] = app_services
+    atexit.register(app_services.stop)
+
+    app.before_request(start_request_timer)
+    app.before_request(admit_request)
+    app.after_request(record_request_metrics)
+    app.teardown_request(finish_admitted_request)
+    app.register_blueprint(api)
+    if frontend_dir:
+        register_frontend(app, frontend_dir)
+    else:
+        app.add_url_rule('/', 'home', api_index)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(405, method_not_allowed)
+    app.register_error_handler(500, internal_error)
+    return app
+
+
+def completed_future(function):
+    """Call function now and return its result (or exception) as a finished Future"""
+    future = Future()
+    try:
+        future.set_result(function())
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+def record_request_metrics(response):
+    """Record the request's latency by method, route pattern and status"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        services.metrics.http_requests.observe(time.perf_counter() - started, method=request.method,
+                                               route=route, status=response.status_code)
+    return response
+
+
+def admit_request():
+    """
+    Admission control for auth and booking endpoints, before any work is
+    done: rate limits per client address, per logged-in user and in total,
+    then load shedding. Refused requests get 429 (this client is over its
+    limit) or 503 (the service is), both with Retry-After.
+    """
+    if request.endpoint not in ADMISSION_CONTROLLED_ENDPOINTS:
+        return None
+
+    if not TRUSTED_PROXY_COUNT and not services.proxy_warning_shown and 'X-Forwarded-For' in request.headers:
+        services.proxy_warning_shown = True
+        print("⚠️  Requests arrive through a proxy (X-Forwarded-For) but TRUSTED_PROXY_COUNT is not set; "
+              "every client shares the proxy's per-address rate limit. Set it to the number of proxies.")
+
+    retry_after = services.ip_limiter.acquire(request.remote_addr or 'unknown')
+    if retry_after:
+        return reject_request('ip', retry_after, 'Too many requests. Please try again later.')
+
+    # Anonymous or invalid tokens are left to the endpoint to refuse
+    user_id = sessions.verify(bearer_token())
+    if user_id:
+        retry_after = services.user_limiter.acquire(user_id)
+        if retry_after:
+            return reject_request('user', retry_after, 'Too many requests. Please try again later.')
+
+    retry_after = services.global_limiter.acquire('all')
+    if retry_after:
+        return reject_request('global', retry_after, 'Server is busy. Please try again shortly.', status=503)
+
+    retry_after = services.load_shedder.admit(request.endpoint)
+    if retry_after:
+        return reject_request('overload', retry_after, 'Server is busy. Please try again shortly.', status=503)
+    g.admitted_at = time.perf_counter()
+    return None
+
+
+def reject_request(reason, retry_after, error, status=429):
+    services.metrics.rejected_requests.inc(reason=reason)
+    return rate_limited_response(retry_after, error, status=status)
+
+
+def finish_admitted_request(exception=None):
+    """Let the load shedder know an admitted request has ended, and how long it took"""
+    admitted_at = g.pop('admitted_at', None)
+    if admitted_at is not None:
+        services.load_shedder.release(time.perf_counter() - admitted_at, request.endpoint)
+
+
+def user_profile(user):
+    """The fields of a user that authenticated requests need"""
+    return {
+        'user_id': user['user_id'],
+        'name': user['name'],
+        'email': user['email']
+    }
+
+
+# ============================================
+# AUTHENTICATION ENDPOINTS
+# ============================================
+
+def upgrade_password_hash(user, new_hash):
+    """Replace an outdated password hash (best effort; login succeeds regardless)"""
+    try:
+        repository.update_password_hash(user['user_id'], user['password_hash'], new_hash)
+    except Exception as e:
+        print(f"Password rehash error: {str(e)}")
+
+
+@api.route('/signup', methods=['POST'])
+def signup():
+    """
+    User registration endpoint
+    Expected JSON: {name, email, phone, password}
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        required_fields = ['name', 'email', 'phone', 'password']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required field: {field}'
+                }), 400
+        
+        email = data['email'].lower().strip()
+        
+        # Generate user ID and hash password
+        user_id = str(uuid.uuid4())
+        try:
+            password_hash = services.password_hasher.hash(data['password'])
+        except PasswordHasherBusy:
+            return rate_limited_response(1, 'Server is busy. Please try again shortly.', status=503)
+        
+        # The repository enforces unique emails atomically, so there is
+        # no separate existence check
+        if not repository.add_user({
+            'user_id': user_id,
+            'name': data['name'],
+            'email': email,
+            'phone': data['phone'],
+            'password_hash': password_hash
+        }):
+            return jsonify({
+                'success': False,
+                'error': 'Email already registered'
+            }), 409
+        
+        return jsonify({
+            'success': True,
+            'user_id': user_id,
+            'message': 'User registered successfully'
+        }), 201
+
+    except Exception as e:
+        print(f"Signup error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@api.route('/login', methods=['POST'])
+def login():
+    """
+    User login endpoint
+    Expected JSON: {email, password}
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if not data.get('email') or not data.get('password'):
+            return jsonify({
+                'success': False,
+                'error': 'Email and password are required'
+            }), 400
+        
+        email = data['email'].lower().strip()
+        
+        # Limit attempts per email before doing any hashing work
+        retry_after = services.login_limiter.acquire(email)
+        if retry_after:
+            return rate_limited_response(retry_after, 'Too many login attempts. Please try again later.')
+        
+        # Find user by email
+        user = repository.find_user_by_email(email)
+        
+        if not user:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid email or password'
+            }), 401
+        
+        # Verify password (in the hashing pool)
+        try:
+            valid, new_hash = services.password_hasher.verify(user['password_hash'], data['password'])
+        except PasswordHasherBusy:
+            return rate_limited_response(1, 'Server is busy. Please try again shortly.', status=503)
+        
+        if not valid:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid email or password'
+            }), 401
+        
+        # Upgrade hashes made with outdated settings
+        if new_hash:
+            upgrade_password_hash(user, new_hash)
+        
+        services.user_profiles.set(user['user_id'], user_profile(user))
+        
+        return jsonify({
+            'success': True,
+            'token': sessions.issue(user['user_id']),
+            'user_id': user['user_id'],
+            'name': user['name'],
+            'email': user['email'],
+            'message': 'Login successful'
+        }), 200
+
+    except Exception as e:
+        print(f"Login error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+# ============================================
+# DOCTOR MANAGEMENT ENDPOINTS
+# ============================================
+
+# Query parameters that switch /doctors to a paginated search
+DOCTOR_SEARCH_PARAMS = ('specialization', 'name', 'limit', 'cursor')
+
+
+def search_doctors_page():
+    """Run a paginated doctor search from the request's query parameters"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        start_key = decode_cursor(request.args.get('cursor'))
+        doctors, last_key = repository.search_doctors(
+            specialization=request.args.get('specialization'),
+            name_prefix=request.args.get('name'),
+            limit=limit,
+            start_key=start_key
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    return jsonify({
+        'success': True,
+        'doctors': doctors,
+        'next_cursor': encode_cursor(last_key)
+    }), 200
+
+
+@api.route('/doctors', methods=['GET'])
+def get_doctors():
+    """
+    Retrieve doctors
+    Query params (all optional): specialization, name (prefix), limit, cursor
+    Returns: List of doctors with their details
+    Without query params the full list is served from an in-process cache
+    and supports If-None-Match/If-Modified-Since
+    """
+    try:
+        if any(param in request.args for param in DOCTOR_SEARCH_PARAMS):
+            return search_doctors_page()
+        
+        entry = services.doctors_cache.get('doctors', repository.list_doctors)
+        
+        return cached_json_response({
+            'success': True,
+            'doctors': entry.value
+        }, entry, DOCTORS_MAX_AGE)
+
+    except Exception as e:
+        print(f"Get doctors error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve doctors'
+        }), 500
+
+
+# ============================================
+# AVAILABILITY ENDPOINTS
+# ============================================
+
+@api.route('/doctors/<doctor_id>/availability', methods=['GET'])
+def get_availability(doctor_id):
+    """
+    Free slots for a doctor
+    Query params: date, or from and to (inclusive, up to 31 days)
+    Returns: {date: [free slots]} computed from the doctor's occupancy bitmaps
+    """
+    try:
+        try:
+            dates = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        doctor = repository.get_doctor(doctor_id)
+        if not doctor:
+            return jsonify({
+                'success': False,
+                'error': 'Doctor not found'
+            }), 404
+        
+        occupancy = repository.get_occupancy(doctor_id, dates)
+        
+        return jsonify({
+            'success': True,
+            'doctor_id': doctor_id,
+            'availability': {
+                date: free_slots(doctor.get('available_slots', []), occupancy[date])
+                for date in dates
+            }
+        }), 200
+
+    except Exception as e:
+        print(f"Get availability error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve availability'
+        }), 500
+
+
+@api.route('/doctors/<doctor_id>/schedule', methods=['GET'])
+@require_session(sessions)
+def get_schedule(doctor_id):
+    """
+    A doctor's booked time slots (the day sheet / roster)
+    Requires: Authorization: Bearer <token from /login>
+    Only dates and times are returned: any patient may call this, so who
+    holds a slot (and the appointment_id that cancels it) stays private.
+    Query params: date, or from and to (inclusive, up to 31 days);
+    limit, cursor (optional)
+    """
+    try:
+        try:
+            dates = parse_date_range(request.args)
+            limit = parse_limit(request.args.get('limit'))
+            start_key = decode_cursor(request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if not repository.get_doctor(doctor_id):
+            return jsonify({
+                'success': False,
+                'error': 'Doctor not found'
+            }), 404
+        
+        try:
+            schedule, last_key = repository.list_doctor_schedule(
+                doctor_id, dates, limit=limit, start_key=start_key)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'doctor_id': doctor_id,
+            'schedule': [{'date': slot['date'], 'time': slot['time']} for slot in schedule],
+            'next_cursor': encode_cursor(last_key)
+        }), 200
+
+    except Exception as e:
+        print(f"Get schedule error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve schedule'
+        }), 500
+
+
+# ============================================
+# APPOINTMENT BOOKING ENDPOINTS
+# ============================================
+
+@api.route('/book-appointment', methods=['POST'])
+@require_session(sessions)
+def book_appointment():
+    """
+    Book an appointment
+    Requires: Authorization: Bearer <token from /login>
+    Expected JSON: {doctor_id, date, time}
+    """
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        required_fields = ['doctor_id', 'date', 'time']
+        for field in required_fields:
+            if field not in data or not data[field]:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required field: {field}'
+                }), 400
+        
+        # The patient is whoever the session token belongs to
+        user_id = g.user_id
+        if data.get('user_id') and data['user_id'] != user_id:
+            return jsonify({
+                'success': False,
+                'error': 'Cannot book appointments for another user'
+            }), 403
+        
+        doctor_id = data['doctor_id']
+        appointment_date = data['date']
+        appointment_time = data['time']
+        
+        # Read the user, the doctor and the slot at the same time
+        user_lookup, doctor_lookup, slot_lookup = services.booking_lookups(
+            user_id, doctor_id, appointment_date, appointment_time)
+        
+        # Validate user exists (usually served from the profile cache)
+        try:
+            user = user_lookup.result()
+            if not user:
+                return jsonify({
+                    'success': False,
+                    'error': 'User not found'
+                }), 404
+        except Exception as e:
+            print(f"Error fetching user: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': 'Invalid user'
+            }), 400
+        
+        # Validate doctor exists
+        try:
+            doctor = doctor_lookup.result()
+            if not doctor:
+                return jsonify({
+                    'success': False,
+                    'error': 'Doctor not found'
+                }), 404
+        except Exception as e:
+            print(f"Error fetching doctor: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': 'Invalid doctor'
+            }), 400
+        
+        # A slot that is already taken is refused without attempting the write
+        try:
+            if slot_lookup.result():
+                return slot_taken_response()
+        except Exception as e:
+            # Not fatal: the reservation below checks the slot atomically
+            print(f"Error checking slot: {str(e)}")
+        
+        # Reserve the slot and create the appointment atomically
+        appointment_id = str(uuid.uuid4())
+        appointment = {
+            'appointment_id': appointment_id,
+            'user_id': user_id,
+            'doctor_id': doctor_id,
+            'date': appointment_date,
+            'time': appointment_time,
+            'status': 'booked',
+            'created_at': datetime.now().isoformat()
+        }
+        
+        try:
+            reserved = repository.add_appointment(appointment)
+        except Exception as e:
+            print(f"Error reserving slot: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': 'Failed to validate appointment slot'
+            }), 500
+        
+        if not reserved:
+            return slot_taken_response()
+        
+        # Queue the confirmation; a background worker delivers it, so
+        # notification latency and outages never hold up the booking
+        notification_dispatcher.enqueue(appointment_confirmation(user, doctor, appointment))
+        
+        return jsonify({
+            'success': True,
+            'appointment_id': appointment_id,
+            'message': 'Appointment booked successfully',
+            'details': {
+                'doctor_name': doctor['name'],
+                'specialization': doctor['specialization'],
+                'date': appointment_date,
+                'time': appointment_time
+            }
+        }), 201
+
+    except Exception as e:
+        print(f"Book appointment error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to book appointment'
+        }), 500
+
+
+def slot_taken_response():
+    return jsonify({
+        'success': False,
+        'error': 'This time slot is already booked. Please select another time.',
+        'waitlist_available': True
+    }), 409
+
+
+def batch_failure(status, error):
+    """Result entry for an appointment of a batch that was not booked"""
+    return {'success': False, 'status': status, 'error': error}
+
+
+@api.route('/appointments/batch', methods=['POST'])
+@require_session(sessions)
+def book_appointments_batch():
+    """
+    Book several appointments for the logged-in user in one request
+    Requires: Authorization: Bearer <token from /login>
+    Expected JSON: {appointments: [{doctor_id, date, time}, ...]} (up to 50)
+    Returns one result per requested appointment, in request order. The
+    doctors are read together and the bookings are written in batches.
+    """
+    try:
+        data = request.get_json() or {}
+        requested = data.get('appointments')
+        if not isinstance(requested, list) or not requested:
+            return jsonify({
+                'success': False,
+                'error': 'appointments must be a non-empty list'
+            }), 400
+        if len(requested) > MAX_BATCH_BOOKINGS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_BOOKINGS} appointments per request'
+            }), 400
+        
+        user = services.get_user_profile(g.user_id)
+        if not user:
+            return jsonify({
+                'success': False,
+                'error': 'User not found'
+            }), 404
+        
+        # Validate the shape of each entry and drop repeats of a slot
+        results = [None] * len(requested)
+        wanted = {}
+        for index, item in enumerate(requested):
+            missing = next((field for field in ('doctor_id', 'date', 'time')
+                            if not isinstance(item, dict) or not item.get(field)), None)
+            if missing:
+                results[index] = batch_failure(400, f'Missing required field: {missing}')
+            elif (item['doctor_id'], item['date'], item['time']) in wanted.values():
+                results[index] = batch_failure(409, 'This slot appears more than once in the request')
+            else:
+                wanted[index] = (item['doctor_id'], item['date'], item['time'])
+        
+        doctors = repository.get_doctors({slot[0] for slot in wanted.values()})
+        
+        appointments = {}
+        created_at = datetime.now().isoformat()
+        for index, (doctor_id, appointment_date, appointment_time) in wanted.items():
+            if doctor_id not in doctors:
+                results[index] = batch_failure(404, 'Doctor not found')
+            else:
+                appointments[index] = {
+                    'appointment_id': str(uuid.uuid4()),
+                    'user_id': user['user_id'],
+                    'doctor_id': doctor_id,
+                    'date': appointment_date,
+                    'time': appointment_time,
+                    'status': 'booked',
+                    'created_at': created_at
+                }
+        
+        failures = repository.add_appointments(list(appointments.values()))
+        
+        for index, appointment in appointments.items():
+            status = failures.get(appointment['appointment_id'])
+            if status == 409:
+                results[index] = batch_failure(
+                    409, 'This time slot is already booked. Please select another time.')
+            elif status:
+                results[index] = batch_failure(status, 'Failed to book appointment. Please try again.')
+            else:
+                doctor = doctors[appointment['doctor_id']]
+                notification_dispatcher.enqueue(appointment_confirmation(user, doctor, appointment))
+                results[index] = {
+                    'success': True,
+                    'status': 201,
+                    'appointment_id': appointment['appointment_id'],
+                    'details': {
+                        'doctor_name': doctor['name'],
+                        'specialization': doctor['specialization'],
+                        'date': appointment['date'],
+                        'time': appointment['time']
+                    }
+                }
+        
+        booked = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'booked': booked,
+            'failed': len(results) - booked,
+            'results': results
+        }), 200
+
+    except Exception as e:
+        print(f"Batch booking error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to book appointments'
+        }), 500
+
+
+# ============================================
+# CANCELLATION AND RESCHEDULING ENDPOINTS
+# ============================================
+
+def load_own_appointment(appointment_id):
+    """
+    Fetch an appointment of the logged-in user.
+    Returns (appointment, None) or (None, error response).
+    """
+    appointment = repository.get_appointment(appointment_id)
+    if not appointment:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Appointment not found'
+        }), 404)
+    if appointment['user_id'] != g.user_id:
+        return None, (jsonify({
+            'success': False,
+            'error': 'Cannot change appointments of another user'
+        }), 403)
+    if appointment.get('status') != 'booked':
+        return None, (jsonify({
+            'success': False,
+            'error': f"Appointment is already {appointment.get('status', 'closed')}"
+        }), 409)
+    return appointment, None
+
+
+def appointment_changed_response():
+    return jsonify({
+        'success': False,
+        'error': 'This appointment was changed by another request. Please reload and try again.'
+    }), 409
+
+
+@api.route('/appointments/<appointment_id>/cancel', methods=['POST'])
+@require_session(sessions)
+def cancel_appointment(appointment_id):
+    """
+    Cancel a booked appointment and free its slot
+    Requires: Authorization: Bearer <token from /login>
+    """
+    try:
+        appointment, error = load_own_appointment(appointment_id)
+        if error:
+            return error
+        
+        cancelled = repository.cancel_appointment(appointment)
+        if not cancelled:
+            return appointment_changed_response()
+        waitlist_promoter.schedule(appointment['doctor_id'], appointment['date'], appointment['time'])
+        
+        user = services.get_user_profile(appointment['user_id'])
+        doctor = repository.get_doctor(appointment['doctor_id'])
+        if user and doctor:
+            notification_dispatcher.enqueue(appointment_cancellation(user, doctor, cancelled))
+        
+        return jsonify({
+            'success': True,
+            'message': 'Appointment cancelled successfully',
+            'appointment': cancelled
+        }), 200
+
+    except Exception as e:
+        print(f"Cancel appointment error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to cancel appointment'
+        }), 500
+
+
+@api.route('/appointments/<appointment_id>/reschedule', methods=['POST'])
+@require_session(sessions)
+def reschedule_appointment(appointment_id):
+    """
+    Move a booked appointment to another slot with the same doctor
+    Requires: Authorization: Bearer <token from /login>
+    Expected JSON: {date, time}
+    """
+    try:
+        data = request.get_json() or {}
+        
+        for field in ('date', 'time'):
+            if not data.get(field):
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required field: {field}'
+                }), 400
+        
+        appointment, error = load_own_appointment(appointment_id)
+        if error:
+            return error
+        
+        if (data['date'], data['time']) == (appointment['date'], appointment['time']):
+            return jsonify({
+                'success': False,
+                'error': 'The appointment is already at this time'
+            }), 400
+        
+        doctor = repository.get_doctor(appointment['doctor_id'])
+        if not doctor:
+            return jsonify({
+                'success': False,
+                'error': 'Doctor not found'
+            }), 404
+        
+        moved = repository.reschedule_appointment(appointment, data['date'], data['time'])
+        if not moved:
+            if repository.get_appointment(appointment_id) != appointment:
+                return appointment_changed_response()
+            return jsonify({
+                'success': False,
+                'error': 'This time slot is already booked. Please select another time.'
+            }), 409
+        
+        waitlist_promoter.schedule(appointment['doctor_id'], appointment['date'], appointment['time'])
+        
+        user = services.get_user_profile(appointment['user_id'])
+        if user:
+            notification_dispatcher.enqueue(appointment_rescheduled(user, doctor, moved, appointment))
+        
+        return jsonify({
+            'success': True,
+            'appointment_id': appointment_id,
+            'message': 'Appointment rescheduled successfully',
+            'details': {
+                'doctor_name': doctor['name'],
+                'specialization': doctor['specialization'],
+                'date': moved['date'],
+                'time': moved['time']
+            }
+        }), 200
+
+    except Exception as e:
+        print(f"Reschedule appointment error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to reschedule appointment'
+        }), 500
+
+
+# ============================================
+# WAITLIST ENDPOINTS
+# ============================================
+
+def waitlist_slot_from_request():
+    """
+    Read {doctor_id, date, time} from the request body.
+    Returns (slot, None) or (None, error response).
+    """
+    data = request.get_json() or {}
+    for field in ('doctor_id', 'date', 'time'):
+        if not data.get(field):
+            return None, (jsonify({
+                'success': False,
+                'error': f'Missing required field: {field}'
+            }), 400)
+    return (data['doctor_id'], data['date'], data['time']), None
+
+
+@api.route('/waitlist', methods=['POST'])
+@require_session(sessions)
+def join_slot_waitlist():
+    """
+    Join the waitlist of a booked slot; when the slot is released the first
+    user in line is booked into it automatically and notified
+    Requires: Authorization: Bearer <token from /login>
+    Expected JSON: {doctor_id, date, time}
+    """
+    try:
+        slot, error = waitlist_slot_from_request()
+        if error:
+            return error
+        
+        if not repository.get_doctor(slot[0]):
+            return jsonify({
+                'success': False,
+                'error': 'Doctor not found'
+            }), 404
+        
+        reservation = repository.get_reservation(*slot)
+        if not reservation:
+            return jsonify({
+                'success': False,
+                'error': 'This time slot is available. Please book it directly.'
+            }), 409
+        if reservation['user_id'] == g.user_id:
+            return jsonify({
+                'success': False,
+                'error': 'You have already booked this time slot'
+            }), 409
+        
+        position = repository.join_waitlist(*slot, g.user_id)
+        if position is None:
+            on_list = waitlist_position(repository.get_waitlist(*slot), g.user_id)
+            return jsonify({
+                'success': False,
+                'error': 'You are already on the waitlist for this slot' if on_list
+                         else 'The waitlist for this slot is full'
+            }), 409
+        
+        # The slot may have been released between the check and the join
+        if not repository.get_reservation(*slot):
+            waitlist_promoter.schedule(*slot)
+        
+        return jsonify({
+            'success': True,
+            'message': "You're on the waitlist. We'll book the slot and notify you if it opens up.",
+            'position': position
+        }), 201
+
+    except Exception as e:
+        print(f"Join waitlist error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to join waitlist'
+        }), 500
+
+
+@api.route('/waitlist/leave', methods=['POST'])
+@require_session(sessions)
+def leave_slot_waitlist():
+    """
+    Leave the waitlist of a slot
+    Requires: Authorization: Bearer <token from /login>
+    Expected JSON: {doctor_id, date, time}
+    """
+    try:
+        slot, error = waitlist_slot_from_request()
+        if error:
+            return error
+        
+        if not repository.leave_waitlist(*slot, g.user_id):
+            return jsonify({
+                'success': False,
+                'error': 'You are not on the waitlist for this slot'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'message': 'You have left the waitlist'
+        }), 200
+
+    except Exception as e:
+        print(f"Leave waitlist error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to leave waitlist'
+        }), 500
+
+
+# ============================================
+# APPOINTMENT HISTORY ENDPOINTS
+# ============================================
+
+# Values of the `when` query parameter of /users/<user_id>/appointments
+APPOINTMENT_FILTERS = ('upcoming', 'past')
+
+
+@api.route('/users/<user_id>/appointments', methods=['GET'])
+@require_session(sessions)
+def get_user_appointments(user_id):
+    """
+    A user's appointments: upcoming ones soonest first, otherwise newest first
+    Requires: Authorization: Bearer <token from /login> for this user
+    Query params (all optional): when (upcoming | past), limit, cursor
+    """
+    if user_id != g.user_id:
+        return jsonify({
+            'success': False,
+            'error': 'Cannot view appointments of another user'
+        }), 403
+
+    try:
+        when = request.args.get('when')
+        if when and when not in APPOINTMENT_FILTERS:
+            return jsonify({
+                'success': False,
+                'error': 'when must be upcoming or past'
+            }), 400
+        
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            start_key = decode_cursor(request.args.get('cursor'))
+            appointments, last_key = repository.list_user_appointments(
+                user_id, when=when, limit=limit, start_key=start_key)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'appointments': appointments,
+            'next_cursor': encode_cursor(last_key)
+        }), 200
+
+    except Exception as e:
+        print(f"Get appointments error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to retrieve appointments'
+        }), 500
+
+
+# ============================================
+# UTILITY ENDPOINTS
+# ============================================
+
+@api.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        'status': 'healthy',
+        'service': SERVICE_NAME,
+        'storage': repository.name
+    }), 200
+
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Metrics of this process in the Prometheus text format (see metrics.py)"""
+    return Response(services.metrics.render(), content_type=CONTENT_TYPE)
+
+
+def api_index():
+    """Root endpoint when the frontend is served separately"""
+    return jsonify({
+        'message': f'Welcome to {SERVICE_NAME}',
+        'version': '1.0',
+        'storage': repository.name,
+        'endpoints': {
+            'POST /signup': 'User registration',
+            'POST /login': 'User login',
+            'GET /doctors': 'Get all doctors',
+            'GET /doctors/<doctor_id>/availability': "A doctor's free slots",
+            'GET /doctors/<doctor_id>/schedule': "A doctor's booked appointments",
+            'POST /book-appointment': 'Book an appointment',
+            'POST /appointments/batch': 'Book several appointments at once',
+            'POST /waitlist': 'Join the waitlist of a booked slot',
+            'POST /waitlist/leave': 'Leave a waitlist',
+            'POST /appointments/<appointment_id>/cancel': 'Cancel an appointment',
+            'POST /appointments/<appointment_id>/reschedule': 'Move an appointment to another slot',
+            'GET /users/<user_id>/appointments': "List a user's appointments",
+            'GET /health': 'Health check',
+            'GET /metrics': 'Prometheus metrics'
+        }
+    }), 200
+
+
+# ============================================
+# ERROR HANDLERS
+# ============================================
+
+def not_found(error):
+    return jsonify({
+        'success': False,
+        'error': 'Endpoint not found'
+    }), 404
+
+
+def method_not_allowed(error):
+    """
+    405 as JSON. A path that only the frontend fallback (GET /<file>)
+    matches is an unknown endpoint, not a known one called wrongly: 404.
+    """
+    try:
+        endpoint, _ = current_app.url_map.bind_to_environ(request.environ).match(method='GET')
+    except HTTPException:
+        endpoint = None
+    if endpoint == 'frontend':
+        return not_found(error)
+
+    response = jsonify({
+        'success': False,
+        'error': 'Method not allowed'
+    })
+    response.headers['Allow'] = ', '.join(error.valid_methods or [])
+    return response, 405
+
+
+def internal_error(error):
+    return jsonify({
+        'success': False,
+        'error': 'Internal server error'
+    }), 500
@@ -0,0 +1,70 @@
+"""
+Slot availability helpers shared by app.py and app_local.py
+
+A doctor's occupancy for one day is kept as a bitmap (a Python int) with
+one bit per minute of the day: the slot "09:30" is bit 570. Marking,
+clearing and testing a slot are single bit operations, and a day's free
+slots are the doctor's available_slots whose bit is not set.
+"""
+
+from datetime import datetime, timedelta
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Longest date range served by one bulk availability request (days)
+MAX_RANGE_DAYS = 31
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD string. Raises ValueError if it is malformed."""
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid date: {value!r} (expected YYYY-MM-DD)')
+
+
+def parse_date_range(args):
+    """
+    Read the requested dates from query parameters: either `date`, or
+    `from` and `to` (inclusive). Returns a list of YYYY-MM-DD strings.
+    Raises ValueError for missing, malformed or oversized ranges.
+    """
+    if args.get('date'):
+        return [parse_date(args['date']).strftime(DATE_FORMAT)]
+
+    if not args.get('from') or not args.get('to'):
+        raise ValueError('Provide either date or from and to')
+
+    start = parse_date(args['from'])
+    end = parse_date(args['to'])
+    days = (end - start).days + 1
+    if days < 1:
+        raise ValueError('from must not be after to')
+    if days > MAX_RANGE_DAYS:
+        raise ValueError(f'Date range cannot exceed {MAX_RANGE_DAYS} days')
+    return [(start + timedelta(days=offset)).strftime(DATE_FORMAT) for offset in range(days)]
+
+
+def slot_bit(time):
+    """Bitmap bit for an HH:MM slot (0 if the time is not HH:MM)"""
+    try:
+        hours, minutes = time.split(':')
+        minute_of_day = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return 0
+    if not 0 <= minute_of_day < 24 * 60:
+        return 0
+    return 1 << minute_of_day
+
+
+def occupancy_bitmap(times):
+    """Build an occupancy bitmap from booked HH:MM times"""
+    bitmap = 0
+    for time in times:
+        bitmap |= slot_bit(time)
+    return bitmap
+
+
+def free_slots(available_slots, bitmap):
+    """Return the available slots whose bit is not set in the bitmap"""
+    return [time for time in available_slots if not bitmap & slot_bit(time)]
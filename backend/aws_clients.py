@@ -0,0 +1,142 @@
+"""
+Shared AWS client factory
+
+All boto3 clients and resources are built here with one tuned botocore
+configuration (connection pool size, retry mode, timeouts), read from
+environment variables:
+
+    AWS_REGION                  region (default: us-east-1)
+    AWS_MAX_POOL_CONNECTIONS    HTTP connections per client (default: 50)
+    AWS_RETRY_MODE              standard | adaptive | legacy (default: adaptive)
+    AWS_MAX_ATTEMPTS            attempts per call, including the first (default: 5)
+    AWS_CONNECT_TIMEOUT         seconds (default: 2)
+    AWS_READ_TIMEOUT            seconds (default: 5)
+    DYNAMODB_ENDPOINT_URL       e.g. http://localhost:8000 for DynamoDB Local
+    SNS_ENDPOINT_URL            e.g. http://localhost:4566 for LocalStack
+
+Clients are thread-safe, so one client per service is shared by all
+threads of a process. Resources are not thread-safe, so each thread gets
+its own. Both caches are dropped in a forked child process, which must not
+reuse its parent's connections.
+"""
+
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50'))
+RETRY_MODE = os.environ.get('AWS_RETRY_MODE', 'adaptive')
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '5'))
+CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '2'))
+READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '5'))
+
+ENDPOINT_URLS = {
+    'dynamodb': os.environ.get('DYNAMODB_ENDPOINT_URL'),
+    'sns': os.environ.get('SNS_ENDPOINT_URL')
+}
+
+_lock = threading.Lock()
+_process = {'pid': None, 'clients': {}, 'generation': 0}
+_thread = threading.local()
+
+# botocore event handlers added to every client: {unique_id: (event_name, handler)}
+_event_handlers = {}
+
+
+def client_config():
+    """botocore configuration shared by every client and resource"""
+    return Config(
+        region_name=AWS_REGION,
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries={'mode': RETRY_MODE, 'max_attempts': MAX_ATTEMPTS},
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT
+    )
+
+
+def _kwargs(service):
+    kwargs = {'config': client_config()}
+    if ENDPOINT_URLS.get(service):
+        kwargs['endpoint_url'] = ENDPOINT_URLS[service]
+    return kwargs
+
+
+def get_client(service):
+    """Return the process-wide client for a service (thread-safe)"""
+    pid = os.getpid()
+    clients = _process['clients']
+    if _process['pid'] == pid and service in clients:
+        return clients[service]
+
+    with _lock:
+        if _process['pid'] != pid:
+            _process['pid'] = pid
+            _process['clients'] = {}
+        clients = _process['clients']
+        if service not in clients:
+            # boto3.Session objects are not thread-safe; build under the lock
+            clients[service] = boto3.session.Session().client(service, **_kwargs(service))
+            _register_event_handlers(clients[service])
+        return clients[service]
+
+
+def get_resource(service):
+    """Return this thread's resource for a service"""
+    owner = (os.getpid(), _process['generation'])
+    if getattr(_thread, 'owner', None) != owner:
+        _thread.owner = owner
+        _thread.resources = {}
+        _thread.tables = {}
+    if service not in _thread.resources:
+        _thread.resources[service] = boto3.session.Session().resource(service, **_kwargs(service))
+        _register_event_handlers(_thread.resources[service].meta.client)
+    return _thread.resources[service]
+
+
+def get_table(name):
+    """Return this thread's DynamoDB Table object"""
+    resource = get_resource('dynamodb')
+    if name not in _thread.tables:
+        _thread.tables[name] = resource.Table(name)
+    return _thread.tables[name]
+
+
+def register_event_handler(event_name, handler, unique_id):
+    """
+    Add a botocore event handler (e.g. for 'after-call.dynamodb') to every
+    client and resource. Cached ones are dropped so they are rebuilt with
+    it; registering the same unique_id again replaces the handler.
+    """
+    with _lock:
+        _event_handlers[unique_id] = (event_name, handler)
+    reset()
+
+
+def _register_event_handlers(client):
+    for unique_id, (event_name, handler) in list(_event_handlers.items()):
+        client.meta.events.register(event_name, handler, unique_id=unique_id)
+
+
+def reset():
+    """Forget every cached client and resource (e.g. after changing endpoints)"""
+    with _lock:
+        _process['pid'] = None
+        _process['clients'] = {}
+        _process['generation'] += 1
+
+
+class LazyProxy:
+    """
+    Stand-in for a client, resource or table that is looked up on each
+    attribute access, so module-level names like `users_table` always
+    resolve to the calling thread's (and process's) own object.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
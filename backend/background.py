@@ -0,0 +1,124 @@
+"""
+Background work queues
+
+BackgroundWorkers runs items from an in-process queue on worker threads;
+NotificationDispatcher (notifications.py) and WaitlistPromoter
+(waitlist.py) build on it. Workers start on first use, in every process:
+a worker process forked after import (e.g. by gunicorn) gets its own
+queue and threads. stop() finishes what is queued before the process
+exits.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+
+
+class BackgroundWorkers:
+    """
+    Process queued items on `workers` daemon threads. Each worker takes up
+    to `batch_size` items at a time and passes them to process(), which
+    subclasses implement; retry_delay() gives the exponential backoff (with
+    jitter) to wait between their retries.
+    """
+
+    # Worker thread names are '<thread_name>-<index>'
+    thread_name = 'background'
+    # Logged with the number of items still queued when stop() gives up
+    unfinished_message = 'queued items not processed'
+
+    def __init__(self, workers=1, batch_size=1, max_attempts=5, base_delay=0.5, max_delay=30,
+                 max_queue_size=0):
+        self.worker_count = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_size = max_queue_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._workers = []
+        self._pid = None
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def pending(self):
+        """Number of items waiting to be processed"""
+        return self._queue.qsize()
+
+    def stop(self, timeout=10):
+        """
+        Process what is already queued, then stop the workers. Returns
+        within `timeout` seconds even if the queue is full or stuck; the
+        workers are daemon threads, so the process can exit regardless.
+        """
+        with self._lock:
+            if self._pid != os.getpid() or self._stopping:
+                return
+            self._stopping = True
+
+        deadline = time.monotonic() + timeout
+        for _ in self._workers:
+            try:
+                # One end marker per worker, queued behind the remaining items
+                self._queue.put(None, timeout=max(0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(max(0, deadline - time.monotonic()))
+
+        remaining = self.pending()
+        if remaining:
+            print(f"⚠️  {remaining} {self.unfinished_message} before shutdown")
+
+    def process(self, batch):
+        """Handle a batch of queued items (on a worker thread)"""
+        raise NotImplementedError
+
+    def retry_delay(self, attempt):
+        """Seconds to wait after a failed attempt (1-based)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _reset(self):
+        """Clear per-process state kept alongside the queue (called with the lock held)"""
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Fresh process (or forked child): threads from the parent are gone
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._stopping = False
+            self._reset()
+            self._workers = [
+                threading.Thread(target=self._run, name=f'{self.thread_name}-{index}', daemon=True)
+                for index in range(self.worker_count)
+            ]
+            for worker in self._workers:
+                worker.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop_after_batch = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop_after_batch = True
+                    break
+                batch.append(item)
+
+            self.process(batch)
+            if stop_after_batch:
+                return
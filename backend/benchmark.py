@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Care_4_U Hospitals load test and benchmark
+
+Seeds a storage backend with N doctors, users and appointments, then drives
+/login, /doctors and /book-appointment (plus a paginated doctor search) from
+concurrent clients and reports latency percentiles, throughput and whether
+any slot was booked twice.
+
+By default the requests go through the Flask app in this process (no
+network), so the numbers measure the app and its storage backend; the
+per-address and per-user rate limits are off unless set in the environment.
+With --url they go over HTTP to a running server instead; point the harness
+at the same storage (e.g. --backend sqlite with the server's SQLITE_PATH, or
+--backend dynamodb) and the same SESSION_SECRET_KEY, and raise the server's
+rate limits for the run.
+
+Usage:
+    python benchmark.py                                      # memory backend, small run
+    python benchmark.py --backend sqlite --users 100000 --appointments 1000000
+    python benchmark.py --backend moto --doctors 500 --users 5000 --appointments 20000
+    python benchmark.py --backend local --concurrency 32 --requests 5000 --json results.json
+    python benchmark.py --backend sqlite --url http://localhost:5000 --skip-seed
+
+Backends: memory, local, sqlite, dynamodb (real tables, or DynamoDB Local
+via DYNAMODB_ENDPOINT_URL) and moto (in-process DynamoDB stand-in; needs
+`pip install moto`). local and sqlite runs use a fresh temporary directory
+unless --data-dir is given. Runs are reproducible for a given --seed.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+SPECIALIZATIONS = ['Cardiology', 'Pediatrics', 'Dermatology', 'Orthopedics', 'General Medicine',
+                   'Neurology', 'Oncology', 'Psychiatry', 'Radiology', 'Urology']
+FIRST_NAMES = ['Sarah', 'Michael', 'Emily', 'Robert', 'Jennifer', 'David', 'Laura', 'James', 'Maria', 'Daniel']
+LAST_NAMES = ['Johnson', 'Chen', 'Davis', 'Martinez', 'Lee', 'Patel', 'Kim', 'Nguyen', 'Brown', 'Garcia']
+SLOTS = ['09:00', '10:00', '11:00', '12:00', '14:00', '15:00', '16:00', '17:00']
+PASSWORD = 'benchmark-password'
+
+SCENARIOS = ('login', 'doctors', 'search', 'book')
+
+# Users, appointments per seeding call
+SEED_BATCH_SIZE = 25
+
+
+# ============================================
+# BACKEND SETUP
+# ============================================
+
+# Key schema and GSIs of the Care4U_* tables, for creating them in moto
+MOTO_TABLES = {
+    'Care4U_Users': ([('user_id', 'S')], {}),
+    'Care4U_UserEmails': ([('email', 'S')], {}),
+    'Care4U_Doctors': ([('doctor_id', 'S')],
+                       {'specialization-name-index': [('specialization', 'S'), ('name', 'S')]}),
+    'Care4U_Appointments': ([('appointment_id', 'S')],
+                            {'user_id-date-index': [('user_id', 'S'), ('date', 'S')]}),
+    'Care4U_Slots': ([('doctor_id', 'S'), ('slot', 'S')], {}),
+    'Care4U_Waitlist': ([('doctor_id', 'S'), ('slot', 'S')], {})
+}
+
+
+def key_schema(keys):
+    return [{'AttributeName': name, 'KeyType': 'HASH' if index == 0 else 'RANGE'}
+            for index, (name, _) in enumerate(keys)]
+
+
+def start_moto():
+    """Start an in-process DynamoDB stand-in and create the Care4U_* tables"""
+    try:
+        from moto import mock_aws
+    except ImportError:
+        raise SystemExit("The moto backend needs moto: pip install moto")
+
+    # moto never checks credentials, but botocore wants some
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ.pop('DYNAMODB_ENDPOINT_URL', None)
+    mock = mock_aws()
+    mock.start()
+
+    # moto's backends are not thread-safe, so requests into it are served one
+    # at a time. Concurrent moto runs still exercise the conditional writes
+    # and transactions that prevent double booking; for DynamoDB latency use
+    # --backend dynamodb (against real tables or DynamoDB Local).
+    from moto.core.botocore_stubber import BotocoreStubber
+    handle_request = BotocoreStubber.__call__
+    moto_lock = threading.Lock()
+
+    def handle_request_serially(self, *args, **kwargs):
+        with moto_lock:
+            return handle_request(self, *args, **kwargs)
+
+    BotocoreStubber.__call__ = handle_request_serially
+
+    from aws_clients import get_client
+    client = get_client('dynamodb')
+    for table_name, (keys, indexes) in MOTO_TABLES.items():
+        attributes = dict(keys)
+        for index_keys in indexes.values():
+            attributes.update(index_keys)
+        extra = {}
+        if indexes:
+            extra['GlobalSecondaryIndexes'] = [
+                {'IndexName': index_name, 'KeySchema': key_schema(index_keys),
+                 'Projection': {'ProjectionType': 'ALL'}}
+                for index_name, index_keys in indexes.items()
+            ]
+        client.create_table(
+            TableName=table_name,
+            KeySchema=key_schema(keys),
+            AttributeDefinitions=[{'AttributeName': name, 'AttributeType': kind}
+                                  for name, kind in attributes.items()],
+            BillingMode='PAY_PER_REQUEST',
+            **extra
+        )
+    return mock
+
+
+def open_repository(backend, data_dir):
+    """Create the repository for a benchmark run"""
+    from repository import create_repository
+    if backend == 'moto':
+        start_moto()
+        backend = 'dynamodb'
+    return create_repository(backend, data_dir=data_dir)
+
+
+# ============================================
+# SEEDING
+# ============================================
+
+def generate_doctors(count, rng):
+    return [
+        {
+            'doctor_id': f'bench-doc-{index:07d}',
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}',
+            'specialization': SPECIALIZATIONS[index % len(SPECIALIZATIONS)],
+            'available_slots': SLOTS
+        }
+        for index in range(count)
+    ]
+
+
+def user_id_for(index):
+    return f'bench-user-{index:07d}'
+
+
+def email_for(index):
+    return f'bench-user-{index}@example.com'
+
+
+def run_batches(function, items, workers):
+    """Call function on SEED_BATCH_SIZE items at a time from a thread pool"""
+    batches = [items[start:start + SEED_BATCH_SIZE] for start in range(0, len(items), SEED_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, batches))
+
+
+def seed(repository, doctors, user_count, appointment_count, workers):
+    """
+    Write the doctors, users and appointments. Every user gets the same
+    password (hashed once). Appointments fill past dates, one per slot, so
+    they grow the tables without blocking the slots the booking scenario
+    competes for.
+    """
+    from passwords import PASSWORD_HASH_METHOD
+    from werkzeug.security import generate_password_hash
+
+    started = time.perf_counter()
+    repository.put_doctors(doctors)
+    print(f"  {len(doctors)} doctors ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    password_hash = generate_password_hash(PASSWORD, method=PASSWORD_HASH_METHOD)
+    users = [
+        {
+            'user_id': user_id_for(index),
+            'name': f'Benchmark User {index}',
+            'email': email_for(index),
+            'phone': '5550000000',
+            'password_hash': password_hash
+        }
+        for index in range(user_count)
+    ]
+    run_batches(lambda batch: [repository.add_user(user) for user in batch], users, workers)
+    print(f"  {user_count} users ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    yesterday = date.today() - timedelta(days=1)
+    appointments = []
+    for index in range(appointment_count):
+        doctor = doctors[index % len(doctors)]
+        slot = index // len(doctors)
+        appointments.append({
+            'appointment_id': str(uuid.UUID(int=index)),
+            'user_id': user_id_for(index % user_count),
+            'doctor_id': doctor['doctor_id'],
+            'date': (yesterday - timedelta(days=slot // len(SLOTS))).isoformat(),
+            'time': SLOTS[slot % len(SLOTS)],
+            'status': 'booked',
+            'created_at': '2020-01-01T00:00:00'
+        })
+    failures = run_batches(repository.add_appointments, appointments, workers)
+    rejected = sum(len(batch_failures) for batch_failures in failures)
+    print(f"  {appointment_count - rejected} appointments ({time.perf_counter() - started:.1f}s)"
+          + (f", {rejected} already present" if rejected else ""))
+
+
+# ============================================
+# CLIENTS
+# ============================================
+
+class InProcessClient:
+    """Send requests through the Flask app in this process"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def send(self, method, path, body=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self._client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Send requests to a running server"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b'null')
+            except ValueError:
+                return e.code, None
+        except OSError:
+            # Connection refused/reset or timeout
+            return 0, None
+
+
+# ============================================
+# SCENARIOS
+# ============================================
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(name, make_client, make_request, requests, concurrency):
+    """
+    Run `requests` requests from `concurrency` threads, each with its own
+    client. make_request(client, number) sends one request and returns
+    its status code. Returns the scenario's statistics.
+    """
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        client = make_client()
+        local_latencies, local_statuses = [], {}
+        while True:
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                break
+            started = time.perf_counter()
+            try:
+                status = make_request(client, number)
+            except Exception as e:
+                print(f"  {name} request error: {str(e)}")
+                status = 0
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())}
+    }
+
+
+def booking_targets(doctors, args, rng):
+    """The (doctor_id, date, time) slots the booking scenario competes for"""
+    tomorrow = date.today() + timedelta(days=1)
+    contested = doctors[:args.booking_doctors]
+    return [(doctor['doctor_id'], (tomorrow + timedelta(days=day)).isoformat(), slot)
+            for doctor in contested for day in range(args.booking_days) for slot in SLOTS]
+
+
+def check_double_bookings(successes, repository):
+    """
+    Compare the successful bookings with storage.
+    Returns (slots booked more than once, successful bookings that are not
+    the slot's reservation in storage).
+    """
+    by_slot = {}
+    for slot, appointment_id in successes:
+        by_slot.setdefault(slot, []).append(appointment_id)
+    double_booked = sum(1 for appointment_ids in by_slot.values() if len(appointment_ids) > 1)
+    lost = 0
+    for slot, appointment_ids in by_slot.items():
+        reservation = repository.get_reservation(*slot)
+        held = reservation['appointment_id'] if reservation else None
+        lost += sum(1 for appointment_id in appointment_ids if appointment_id != held)
+    return double_booked, lost
+
+
+def run_benchmark(args):
+    rng = random.Random(args.seed)
+    data_dir = args.data_dir
+    temporary_dir = None
+    if args.backend in ('local', 'sqlite') and not data_dir:
+        temporary_dir = data_dir = tempfile.mkdtemp(prefix='care4u-bench-')
+
+    try:
+        repository = open_repository(args.backend, data_dir)
+        doctors = generate_doctors(args.doctors, rng)
+
+        print(f"Backend: {repository.name}" + (f" ({data_dir})" if data_dir else ""))
+        if not args.skip_seed:
+            print("Seeding...")
+            seed(repository, doctors, args.users, args.appointments, args.seed_workers)
+
+        from notifications import MemoryTransport
+        from sessions import SessionManager
+        if args.url:
+            sessions = SessionManager()
+            make_client = lambda: HttpClient(args.url)
+        else:
+            # Every simulated client shares one address and a few users, so
+            # the per-address and per-user limits would only measure themselves
+            os.environ.setdefault('RATE_LIMIT_IP_PER_MINUTE', '0')
+            os.environ.setdefault('RATE_LIMIT_USER_PER_MINUTE', '0')
+            from application import create_app
+            app = create_app(repository, MemoryTransport())
+            sessions = app.extensions['care4u'].sessions
+            make_client = lambda: InProcessClient(app)
+
+        # Each request picks its user and target up front, from the run's seed
+        users = [rng.randrange(args.users) for _ in range(args.requests)]
+        specializations = [rng.choice(SPECIALIZATIONS) for _ in range(args.requests)]
+        targets = booking_targets(doctors, args, rng)
+        bookings = [rng.choice(targets) for _ in range(args.requests)]
+        tokens = {}
+        successes = []
+        successes_lock = threading.Lock()
+
+        def login(client, number):
+            index = users[number]
+            status, _ = client.send('POST', '/login', {'email': email_for(index), 'password': PASSWORD})
+            return status
+
+        def list_doctors(client, number):
+            status, _ = client.send('GET', '/doctors')
+            return status
+
+        def search(client, number):
+            status, _ = client.send('GET', f'/doctors?specialization={specializations[number]}&limit=20')
+            return status
+
+        def book(client, number):
+            user_id = user_id_for(users[number])
+            token = tokens.get(user_id) or tokens.setdefault(user_id, sessions.issue(user_id))
+            doctor_id, appointment_date, appointment_time = bookings[number]
+            status, body = client.send('POST', '/book-appointment', {
+                'doctor_id': doctor_id, 'date': appointment_date, 'time': appointment_time
+            }, token=token)
+            if status == 201:
+                with successes_lock:
+                    successes.append((bookings[number], body['appointment_id']))
+            return status
+
+        scenario_requests = {'login': login, 'doctors': list_doctors, 'search': search, 'book': book}
+        results = []
+        for name in args.scenarios:
+            print(f"Running {name}: {args.requests} requests, concurrency {args.concurrency}...")
+            results.append(run_scenario(name, make_client, scenario_requests[name],
+                                        args.requests, args.concurrency))
+
+        report = {
+            'backend': repository.name,
+            'url': args.url,
+            'records': {'doctors': args.doctors, 'users': args.users, 'appointments': args.appointments},
+            'results': results
+        }
+        if 'book' in args.scenarios:
+            double_booked, lost = check_double_bookings(successes, repository)
+            report['bookings'] = {
+                'contested_slots': len(targets),
+                'booked': len(successes),
+                'double_booked_slots': double_booked,
+                'lost_bookings': lost
+            }
+        return report
+    finally:
+        if temporary_dir and not args.keep_data:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+
+def print_report(report):
+    print(f"\n{'='*96}")
+    print(f"{report['backend']} - {report['records']['doctors']} doctors, {report['records']['users']} users, "
+          f"{report['records']['appointments']} appointments")
+    print(f"{'='*96}")
+    print(f"{'scenario':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}   statuses")
+    for result in report['results']:
+        statuses = ' '.join(f'{status}:{count}' for status, count in result['statuses'].items())
+        print(f"{result['scenario']:<10}{result['requests']:>10}{result['throughput']:>10}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['max_ms']:>10}   {statuses}")
+    bookings = report.get('bookings')
+    if bookings:
+        print(f"\nBookings: {bookings['booked']} of {bookings['contested_slots']} contested slots booked")
+        print(f"Double-booked slots: {bookings['double_booked_slots']}")
+        print(f"Successful bookings missing from storage: {bookings['lost_bookings']}")
+    print(f"{'='*96}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the Care_4_U Hospitals API')
+    parser.add_argument('--backend', default='memory',
+                        choices=['memory', 'local', 'sqlite', 'dynamodb', 'moto'],
+                        help='storage backend to seed and run against (default: memory)')
+    parser.add_argument('--data-dir', help='data directory for local/sqlite (default: a temporary one)')
+    parser.add_argument('--keep-data', action='store_true', help='keep the temporary data directory')
+    parser.add_argument('--url', help='send requests to this running server instead of in-process')
+    parser.add_argument('--doctors', type=int, default=100, help='doctors to seed (default: 100)')
+    parser.add_argument('--users', type=int, default=1000, help='users to seed (default: 1000)')
+    parser.add_argument('--appointments', type=int, default=10000,
+                        help='appointments to seed (default: 10000)')
+    parser.add_argument('--skip-seed', action='store_true', help='use data seeded by an earlier run')
+    parser.add_argument('--seed-workers', type=int, default=16, help='seeding threads (default: 16)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated, run in order (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario (default: 1000)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients (default: 8)')
+    parser.add_argument('--booking-doctors', type=int, default=10,
+                        help='doctors whose slots the booking scenario competes for (default: 10)')
+    parser.add_argument('--booking-days', type=int, default=7,
+                        help='days of slots the booking scenario competes for (default: 7)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (default: 42)')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    if min(args.doctors, args.users, args.requests, args.concurrency) < 1:
+        parser.error('--doctors, --users, --requests and --concurrency must be at least 1')
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+
+    bookings = report.get('bookings', {})
+    exit(1 if bookings.get('double_booked_slots') or bookings.get('lost_bookings') else 0)
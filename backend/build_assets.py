@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Care_4_U Hospitals frontend build
+
+Copies frontend/ to frontend/dist/ ready for production:
+- images are converted to WebP, scaled down to twice the largest size the
+  pages show them at (IMAGE_WIDTHS);
+- CSS, JavaScript and images get a hash of their content in their name
+  (style.3f2a9c01d4.css), and every reference to them in the HTML, CSS and
+  JavaScript is rewritten, so they can be cached forever;
+- text files get precompressed .gz and .br copies next to them.
+
+HTML pages keep their names, since they are what users navigate to.
+app.py serves frontend/dist/ when it exists (see static_assets.py);
+manifest.json in it maps each source file to its built name.
+
+Usage:
+    python build_assets.py
+    python build_assets.py --source ../frontend --output ../frontend/dist
+
+WebP conversion needs Pillow and .br files need brotli
+(`pip install Pillow brotli`); without them images are only renamed and
+only .gz files are written.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+
+PAGE_EXTENSIONS = {'.html'}
+ASSET_EXTENSIONS = {'.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.ico'}
+RASTER_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+TEXT_EXTENSIONS = {'.html', '.css', '.js', '.svg', '.json'}
+
+# Widths (pixels) images are scaled down to: twice their largest CSS size,
+# for high-density screens. Others keep at most DEFAULT_IMAGE_WIDTH.
+IMAGE_WIDTHS = {
+    'images/doctor-1.png': 240,
+    'images/doctor-2.png': 240,
+    'images/doctor-3.png': 240,
+    'images/doctor-4.png': 240,
+    'images/doctor-5.png': 240,
+    'images/doctor-6.png': 240,
+    'images/hospital-exterior.png': 1000
+}
+DEFAULT_IMAGE_WIDTH = 1920
+WEBP_QUALITY = 80
+
+# Hex digits of the content hash in built file names (see static_assets.py)
+HASH_LENGTH = 10
+
+# Order files are built in (others first), so references can be rewritten
+BUILD_ORDER = {'.css': 1, '.js': 2, '.html': 3}
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(path, data):
+    """images/doctor-1.webp -> images/doctor-1.<hash>.webp"""
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{content_hash(data)}{extension}'
+
+
+def to_webp(path, data):
+    """Re-encode an image as WebP, no wider than its entry in IMAGE_WIDTHS"""
+    image = Image.open(io.BytesIO(data))
+    image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    width = IMAGE_WIDTHS.get(path, DEFAULT_IMAGE_WIDTH)
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return output.getvalue()
+
+
+def rewrite_references(text, manifest, base_dir):
+    """
+    Replace references to source files with their built names. References
+    are relative to the referring file, which lives in base_dir.
+    """
+    for source, built in manifest.items():
+        source_ref = os.path.relpath(source, base_dir).replace(os.sep, '/')
+        built_ref = os.path.relpath(built, base_dir).replace(os.sep, '/')
+        pattern = r'(?<![\w./-])' + re.escape(source_ref) + r'(?![\w.-])'
+        text = re.sub(pattern, built_ref, text)
+    return text
+
+
+def compress(path):
+    """Write .gz (and .br when available) copies of a file that are smaller than it"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append((suffix, len(compressed)))
+    return written
+
+
+def collect_files(source_dir, output_dir):
+    """Relative paths of the pages and assets under source_dir, in sorted order"""
+    files = []
+    for root, dirs, names in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.')
+                         and os.path.abspath(os.path.join(root, d)) != output_dir)
+        for name in sorted(names):
+            extension = os.path.splitext(name)[1].lower()
+            if extension in PAGE_EXTENSIONS or extension in ASSET_EXTENSIONS:
+                files.append(os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, '/'))
+    return files
+
+
+def build(source_dir, output_dir):
+    """Build source_dir into output_dir. Returns the manifest."""
+    source_dir = os.path.abspath(source_dir)
+    output_dir = os.path.abspath(output_dir)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+
+    files = collect_files(source_dir, output_dir)
+    manifest = {}
+    outputs = {}
+
+    def read(path):
+        with open(os.path.join(source_dir, path), 'rb') as f:
+            return f.read()
+
+    # Images first, then CSS (which refers to images), then JavaScript and
+    # pages, so every file is rewritten before its own hash is taken
+    def build_order(path):
+        return BUILD_ORDER.get(os.path.splitext(path)[1].lower(), 0)
+
+    for path in sorted(files, key=build_order):
+        extension = os.path.splitext(path)[1].lower()
+        data = read(path)
+        if extension in TEXT_EXTENSIONS:
+            text = data.decode('utf-8')
+            data = rewrite_references(text, manifest, os.path.dirname(path) or '.').encode('utf-8')
+        elif extension in RASTER_EXTENSIONS and Image:
+            data = to_webp(path, data)
+            extension = '.webp'
+
+        if extension in PAGE_EXTENSIONS:
+            built = path
+        else:
+            built = fingerprinted_name(os.path.splitext(path)[0] + extension, data)
+            manifest[path] = built
+        outputs[built] = data
+
+        destination = os.path.join(output_dir, built)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, 'wb') as f:
+            f.write(data)
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"{'file':<48}{'source':>12}{'built':>12}{'gzip':>10}{'brotli':>10}")
+    for built, data in sorted(outputs.items()):
+        source = next((path for path, name in manifest.items() if name == built), built)
+        sizes = dict(compress(os.path.join(output_dir, built))) \
+            if os.path.splitext(built)[1] in TEXT_EXTENSIONS else {}
+        print(f"{built:<48}{len(read(source)):>12}{len(data):>12}"
+              f"{sizes.get('.gz', '-'):>10}{sizes.get('.br', '-'):>10}")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the frontend for production')
+    parser.add_argument('--source', default=FRONTEND_DIR, help='frontend directory (default: ../frontend)')
+    parser.add_argument('--output', help='build directory (default: <source>/dist)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.source, 'dist')
+    print("="*60)
+    print("Care_4_U Hospitals - Frontend Build")
+    print("="*60)
+    print(f"Source: {os.path.abspath(args.source)}")
+    print(f"Output: {os.path.abspath(output)}")
+    if not Image:
+        print("⚠️  Pillow is not installed; images are copied without WebP conversion")
+    if not brotli:
+        print("⚠️  brotli is not installed; only .gz copies are written")
+    print("="*60)
+
+    manifest = build(args.source, output)
+
+    print("="*60)
+    print(f"✓ Built {len(manifest)} assets into {os.path.abspath(output)}")
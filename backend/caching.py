@@ -0,0 +1,113 @@
+"""
+In-process caching helpers shared by app.py and app_local.py
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import jsonify, request
+
+
+class CacheEntry:
+    """A cached value with the validators used for conditional GETs"""
+
+    def __init__(self, value, etag, last_modified, expires_at):
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire after `ttl` seconds.
+    Each entry carries an ETag (hash of its JSON form) and the time its
+    content last changed, so HTTP responses can be revalidated cheaply.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return the entry for `key`, calling `loader()` if it is missing or stale"""
+        entry = self._entries.get(key)
+        if entry and entry.expires_at > time.monotonic():
+            return entry
+
+        with self._lock:
+            # Another thread may have reloaded it while we waited
+            entry = self._entries.get(key)
+            if entry and entry.expires_at > time.monotonic():
+                return entry
+
+            value = loader()
+            etag = compute_etag(value)
+            if entry and entry.etag == etag:
+                last_modified = entry.last_modified
+            else:
+                last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+            entry = CacheEntry(value, etag, last_modified, time.monotonic() + self.ttl)
+            self._entries[key] = entry
+            return entry
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used key beyond maxsize"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._entries.pop(key, None)
+
+
+def compute_etag(value):
+    """Stable hash of a JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def cached_json_response(payload, entry, max_age):
+    """
+    Build a JSON response carrying the entry's ETag and Last-Modified.
+    Returns 304 Not Modified when the request's If-None-Match or
+    If-Modified-Since shows the client already has this version.
+    """
+    response = jsonify(payload)
+    response.set_etag(entry.etag)
+    response.last_modified = entry.last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
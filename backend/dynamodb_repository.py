@@ -0,0 +1,691 @@
+"""
+DynamoDB storage backend (see repository.py)
+
+Tables:
+    Care4U_Users          user_id
+    Care4U_UserEmails     email -> user_id (enforces unique emails)
+    Care4U_Doctors        doctor_id; GSI specialization-name-index
+    Care4U_Appointments   appointment_id; GSI user_id-date-index
+    Care4U_Slots          (doctor_id, date#time) -> holding appointment
+    Care4U_Waitlist       (doctor_id, date#time) -> waiting user_ids
+
+Clients come from the shared factory in aws_clients.py; the table objects
+resolve to the calling thread's own boto3 resource.
+"""
+
+import time
+import uuid
+from datetime import datetime
+
+from boto3.dynamodb.conditions import Attr, Key
+
+from aws_clients import LazyProxy, get_resource, get_table, register_event_handler
+from availability import occupancy_bitmap
+from metrics import record_consumed_capacity, request_consumed_capacity
+from repository import Repository
+from seed_doctors import import_doctors
+from waitlist import MAX_WAITLIST_LENGTH, waitlist_position
+
+# DynamoDB Tables
+USERS_TABLE = 'Care4U_Users'
+USER_EMAILS_TABLE = 'Care4U_UserEmails'
+DOCTORS_TABLE = 'Care4U_Doctors'
+DOCTORS_SPECIALIZATION_INDEX = 'specialization-name-index'
+APPOINTMENTS_TABLE = 'Care4U_Appointments'
+APPOINTMENTS_USER_INDEX = 'user_id-date-index'
+SLOTS_TABLE = 'Care4U_Slots'
+WAITLIST_TABLE = 'Care4U_Waitlist'
+
+# Bookings per transaction (two actions each, within DynamoDB's 100)
+BOOKINGS_PER_TRANSACTION = 25
+
+# BatchGetItem reads at most 100 keys per call
+BATCH_GET_LIMIT = 100
+
+# Items read per Scan call when searching doctors by name alone
+NAME_SCAN_PAGE_SIZE = 100
+
+
+def slot_key(appointment_date, appointment_time):
+    """Sort key of a slot reservation in Care4U_Slots (e.g. 2024-05-01#09:00)"""
+    return f"{appointment_date}#{appointment_time}"
+
+
+def is_condition_failure(error):
+    """Return True if a cancelled transaction failed on a condition check"""
+    reasons = error.response.get('CancellationReasons', [])
+    return any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons)
+
+
+def booked_appointment_condition(appointment):
+    """
+    Update condition that the appointment is still booked in the slot we
+    read, so a concurrent cancel or reschedule makes the transaction fail
+    """
+    return {
+        'ConditionExpression': '#status = :booked AND #date = :date AND #time = :time',
+        'ExpressionAttributeNames': {'#status': 'status', '#date': 'date', '#time': 'time'},
+        'ExpressionAttributeValues': {
+            ':booked': 'booked',
+            ':date': appointment['date'],
+            ':time': appointment['time']
+        }
+    }
+
+
+def reservation_operations(appointment):
+    """Transaction steps that claim an appointment's slot and create it"""
+    return [
+        {
+            'Put': {
+                'TableName': SLOTS_TABLE,
+                'Item': {
+                    'doctor_id': appointment['doctor_id'],
+                    'slot': slot_key(appointment['date'], appointment['time']),
+                    'appointment_id': appointment['appointment_id'],
+                    'user_id': appointment['user_id']
+                },
+                'ConditionExpression': 'attribute_not_exists(slot)'
+            }
+        },
+        {
+            'Put': {
+                'TableName': APPOINTMENTS_TABLE,
+                'Item': appointment,
+                'ConditionExpression': 'attribute_not_exists(appointment_id)'
+            }
+        }
+    ]
+
+
+def release_slot_operation(appointment):
+    """
+    Transaction step deleting an appointment's slot reservation, but only
+    while the appointment still holds it (a missing reservation, e.g. from
+    before Care4U_Slots existed, is not an error)
+    """
+    return {
+        'Delete': {
+            'TableName': SLOTS_TABLE,
+            'Key': {
+                'doctor_id': appointment['doctor_id'],
+                'slot': slot_key(appointment['date'], appointment['time'])
+            },
+            'ConditionExpression': 'attribute_not_exists(slot) OR appointment_id = :appointment_id',
+            'ExpressionAttributeValues': {':appointment_id': appointment['appointment_id']}
+        }
+    }
+
+
+class DynamoDBRepository(Repository):
+    """Storage on the Care4U_* DynamoDB tables"""
+
+    name = 'DynamoDB'
+
+    def __init__(self):
+        self.dynamodb = LazyProxy(lambda: get_resource('dynamodb'))
+        self.users_table = LazyProxy(lambda: get_table(USERS_TABLE))
+        self.user_emails_table = LazyProxy(lambda: get_table(USER_EMAILS_TABLE))
+        self.doctors_table = LazyProxy(lambda: get_table(DOCTORS_TABLE))
+        self.appointments_table = LazyProxy(lambda: get_table(APPOINTMENTS_TABLE))
+        self.slots_table = LazyProxy(lambda: get_table(SLOTS_TABLE))
+        self.waitlist_table = LazyProxy(lambda: get_table(WAITLIST_TABLE))
+
+    @property
+    def client(self):
+        return self.dynamodb.meta.client
+
+    def register_metrics(self, metrics):
+        """
+        Have every DynamoDB call return its consumed capacity, and count it
+        per table in the registry of the app that made the call (the
+        handlers are process-wide, so several apps can share them)
+        """
+        register_event_handler('before-parameter-build.dynamodb', request_consumed_capacity,
+                               'care4u-request-consumed-capacity')
+        register_event_handler('after-call.dynamodb', record_consumed_capacity,
+                               'care4u-record-consumed-capacity')
+
+    # ----------------------------------------
+    # Users
+    # ----------------------------------------
+
+    def get_user(self, user_id):
+        return self.users_table.get_item(Key={'user_id': user_id}).get('Item')
+
+    def find_user_by_email(self, email):
+        """
+        Look up a user by email address.
+        Resolves the email through the Care4U_UserEmails uniqueness table
+        (partition key: email) and then fetches the user record, so the cost
+        is two key lookups regardless of how many users exist.
+        """
+        email_response = self.user_emails_table.get_item(
+            Key={'email': email},
+            ConsistentRead=True
+        )
+        if 'Item' not in email_response:
+            return None
+
+        user_response = self.users_table.get_item(
+            Key={'user_id': email_response['Item']['user_id']},
+            ConsistentRead=True
+        )
+        return user_response.get('Item')
+
+    def add_user(self, user):
+        """
+        Store the user and claim the email in a single transaction.
+        The conditional put on Care4U_UserEmails enforces uniqueness, so no
+        pre-scan of the Users table is needed.
+        """
+        try:
+            self.client.transact_write_items(
+                TransactItems=[
+                    {
+                        'Put': {
+                            'TableName': USERS_TABLE,
+                            'Item': user,
+                            'ConditionExpression': 'attribute_not_exists(user_id)'
+                        }
+                    },
+                    {
+                        'Put': {
+                            'TableName': USER_EMAILS_TABLE,
+                            'Item': {
+                                'email': user['email'],
+                                'user_id': user['user_id']
+                            },
+                            'ConditionExpression': 'attribute_not_exists(email)'
+                        }
+                    }
+                ]
+            )
+        except self.client.exceptions.TransactionCanceledException as e:
+            if not is_condition_failure(e):
+                raise
+            return False
+        return True
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        try:
+            self.users_table.update_item(
+                Key={'user_id': user_id},
+                UpdateExpression='SET password_hash = :new_hash',
+                ConditionExpression='password_hash = :old_hash',
+                ExpressionAttributeValues={
+                    ':new_hash': new_hash,
+                    ':old_hash': old_hash
+                }
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    # ----------------------------------------
+    # Doctors
+    # ----------------------------------------
+
+    def list_doctors(self):
+        """Read the full doctor catalog, following scan pagination"""
+        doctors = []
+        scan_kwargs = {}
+        while True:
+            response = self.doctors_table.scan(**scan_kwargs)
+            doctors.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return doctors
+
+    def get_doctor(self, doctor_id):
+        return self.doctors_table.get_item(Key={'doctor_id': doctor_id}).get('Item')
+
+    def get_doctors(self, doctor_ids):
+        found = self.batch_get({DOCTORS_TABLE: [{'doctor_id': doctor_id} for doctor_id in set(doctor_ids)]})
+        return {doctor['doctor_id']: doctor for doctor in found[DOCTORS_TABLE]}
+
+    def search_doctors(self, specialization=None, name_prefix=None, limit=20, start_key=None):
+        """
+        With a specialization this queries the specialization-name-index GSI
+        (partition: specialization, sort: name), so only matching doctors are
+        read. Otherwise it scans the table. A name prefix alone is a filter on
+        that scan, which DynamoDB applies after reading, so scanning goes on
+        until `limit` doctors match or the table ends: a rare prefix can read
+        (and be billed for) the whole table in one request.
+        """
+        if specialization:
+            page_kwargs = {'Limit': limit}
+            if start_key:
+                if set(start_key) != {'doctor_id', 'specialization', 'name'} or \
+                        start_key['specialization'] != specialization:
+                    raise ValueError('Invalid cursor')
+                page_kwargs['ExclusiveStartKey'] = start_key
+            condition = Key('specialization').eq(specialization)
+            if name_prefix:
+                condition = condition & Key('name').begins_with(name_prefix)
+            response = self.doctors_table.query(
+                IndexName=DOCTORS_SPECIALIZATION_INDEX,
+                KeyConditionExpression=condition,
+                **page_kwargs
+            )
+            return response['Items'], response.get('LastEvaluatedKey')
+
+        if start_key and set(start_key) != {'doctor_id'}:
+            raise ValueError('Invalid cursor')
+        page_kwargs = {'Limit': max(limit, NAME_SCAN_PAGE_SIZE) if name_prefix else limit}
+        if name_prefix:
+            page_kwargs['FilterExpression'] = Attr('name').begins_with(name_prefix)
+
+        doctors = []
+        while True:
+            if start_key:
+                page_kwargs['ExclusiveStartKey'] = start_key
+            response = self.doctors_table.scan(**page_kwargs)
+            doctors.extend(response['Items'])
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key or len(doctors) >= limit:
+                break
+
+        if len(doctors) > limit:
+            # The next page starts after the last doctor returned
+            doctors = doctors[:limit]
+            start_key = {'doctor_id': doctors[-1]['doctor_id']}
+        return doctors, start_key
+
+    def put_doctors(self, doctors):
+        """Parallel batch upserts (see seed_doctors.py)"""
+        return import_doctors(doctors, table_name=DOCTORS_TABLE)
+
+    # ----------------------------------------
+    # Appointments and slots
+    # ----------------------------------------
+
+    def get_appointment(self, appointment_id):
+        response = self.appointments_table.get_item(
+            Key={'appointment_id': appointment_id},
+            ConsistentRead=True
+        )
+        return response.get('Item')
+
+    def get_reservation(self, doctor_id, date, time):
+        """The Care4U_Slots item holding a slot (None if the slot is free)"""
+        response = self.slots_table.get_item(
+            Key={'doctor_id': doctor_id, 'slot': slot_key(date, time)},
+            ConsistentRead=True
+        )
+        return response.get('Item')
+
+    def add_appointment(self, appointment):
+        """
+        Reserve a doctor's slot and create the appointment atomically.
+        Care4U_Slots is keyed by (doctor_id, slot), so the conditional put
+        fails if the slot is already held, no matter how many appointments
+        exist. Both writes happen in one transaction, so concurrent bookings
+        for the same slot cannot both succeed.
+        """
+        try:
+            self.client.transact_write_items(
+                TransactItems=reservation_operations(appointment)
+            )
+        except self.client.exceptions.TransactionCanceledException as e:
+            if not is_condition_failure(e):
+                raise
+            return False
+        return True
+
+    def add_appointments(self, appointments):
+        """
+        Existing reservations are read with one BatchGetItem pass, then the
+        remaining bookings are written BOOKINGS_PER_TRANSACTION per
+        transaction. A taken slot does not sink the rest of its transaction:
+        the CancellationReasons show which bookings failed their condition,
+        and the transaction is retried without them.
+        """
+        failures = {}
+        pending = []
+        claimed = set()
+        for appointment in appointments:
+            slot = (appointment['doctor_id'], slot_key(appointment['date'], appointment['time']))
+            if slot in claimed:
+                failures[appointment['appointment_id']] = 409
+            else:
+                claimed.add(slot)
+                pending.append(appointment)
+
+        found = self.batch_get({
+            SLOTS_TABLE: [{'doctor_id': doctor_id, 'slot': slot} for doctor_id, slot in claimed]
+        })
+        reserved = {(item['doctor_id'], item['slot']) for item in found[SLOTS_TABLE]}
+        appointments = []
+        for appointment in pending:
+            if (appointment['doctor_id'], slot_key(appointment['date'], appointment['time'])) in reserved:
+                failures[appointment['appointment_id']] = 409
+            else:
+                appointments.append(appointment)
+
+        for start in range(0, len(appointments), BOOKINGS_PER_TRANSACTION):
+            chunk = appointments[start:start + BOOKINGS_PER_TRANSACTION]
+            while chunk:
+                try:
+                    self.client.transact_write_items(TransactItems=[
+                        operation for appointment in chunk
+                        for operation in reservation_operations(appointment)
+                    ])
+                    break
+                except self.client.exceptions.TransactionCanceledException as e:
+                    reasons = e.response.get('CancellationReasons', [])
+                    # Two operations per booking, in order
+                    taken = {
+                        chunk[index // 2]['appointment_id']
+                        for index, reason in enumerate(reasons)
+                        if reason.get('Code') == 'ConditionalCheckFailed'
+                    }
+                    if not taken:
+                        print(f"Batch booking transaction failed: {str(e)}")
+                        failures.update({appointment['appointment_id']: 503 for appointment in chunk})
+                        break
+                    failures.update({appointment_id: 409 for appointment_id in taken})
+                    chunk = [appointment for appointment in chunk
+                             if appointment['appointment_id'] not in taken]
+        return failures
+
+    def batch_get(self, keys_by_table):
+        """
+        Read items from several tables with BatchGetItem, BATCH_GET_LIMIT keys
+        per call, retrying unprocessed keys with backoff.
+        Returns {table name: [items found]}.
+        """
+        found = {table: [] for table in keys_by_table}
+        pending = [(table, key) for table, keys in keys_by_table.items() for key in keys]
+        for start in range(0, len(pending), BATCH_GET_LIMIT):
+            request_items = {}
+            for table, key in pending[start:start + BATCH_GET_LIMIT]:
+                request_items.setdefault(table, {'Keys': [], 'ConsistentRead': True})['Keys'].append(key)
+            attempt = 0
+            while request_items:
+                if attempt:
+                    time.sleep(min(0.05 * 2 ** attempt, 1))
+                response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                for table, items in response['Responses'].items():
+                    found[table].extend(items)
+                request_items = response.get('UnprocessedKeys') or {}
+                attempt += 1
+        return found
+
+    def cancel_appointment(self, appointment):
+        """Mark the appointment cancelled and release its slot in one transaction"""
+        cancelled = {**appointment, 'status': 'cancelled', 'cancelled_at': datetime.now().isoformat()}
+        condition = booked_appointment_condition(appointment)
+        condition['ExpressionAttributeValues'][':cancelled'] = 'cancelled'
+        condition['ExpressionAttributeValues'][':cancelled_at'] = cancelled['cancelled_at']
+        try:
+            self.client.transact_write_items(
+                TransactItems=[
+                    {
+                        'Update': {
+                            'TableName': APPOINTMENTS_TABLE,
+                            'Key': {'appointment_id': appointment['appointment_id']},
+                            'UpdateExpression': 'SET #status = :cancelled, cancelled_at = :cancelled_at',
+                            **condition
+                        }
+                    },
+                    release_slot_operation(appointment)
+                ]
+            )
+        except self.client.exceptions.TransactionCanceledException as e:
+            if not is_condition_failure(e):
+                raise
+            return None
+        return cancelled
+
+    def reschedule_appointment(self, appointment, new_date, new_time):
+        """
+        Claim the new slot, release the old one and update the appointment
+        in one transaction. Either all three happen or none do, so the
+        patient never holds two slots and the old slot is never lost to a
+        failed move.
+        """
+        moved = {
+            **appointment,
+            'date': new_date,
+            'time': new_time,
+            'rescheduled_at': datetime.now().isoformat()
+        }
+        condition = booked_appointment_condition(appointment)
+        condition['ExpressionAttributeValues'].update({
+            ':new_date': new_date,
+            ':new_time': new_time,
+            ':rescheduled_at': moved['rescheduled_at']
+        })
+        try:
+            self.client.transact_write_items(
+                TransactItems=[
+                    {
+                        'Put': {
+                            'TableName': SLOTS_TABLE,
+                            'Item': {
+                                'doctor_id': appointment['doctor_id'],
+                                'slot': slot_key(new_date, new_time),
+                                'appointment_id': appointment['appointment_id'],
+                                'user_id': appointment['user_id']
+                            },
+                            'ConditionExpression': 'attribute_not_exists(slot)'
+                        }
+                    },
+                    release_slot_operation(appointment),
+                    {
+                        'Update': {
+                            'TableName': APPOINTMENTS_TABLE,
+                            'Key': {'appointment_id': appointment['appointment_id']},
+                            'UpdateExpression': 'SET #date = :new_date, #time = :new_time, '
+                                                'rescheduled_at = :rescheduled_at',
+                            **condition
+                        }
+                    }
+                ]
+            )
+        except self.client.exceptions.TransactionCanceledException as e:
+            if not is_condition_failure(e):
+                raise
+            return None
+        return moved
+
+    def list_user_appointments(self, user_id, when=None, limit=20, start_key=None):
+        """
+        Queries the user_id-date-index GSI (partition: user_id, sort: date),
+        so the cost depends on the user's own appointments, not the table size.
+        Upcoming appointments are filtered to booked ones; since DynamoDB
+        filters after reading a page, further pages are read until this one
+        is full.
+        """
+        today = datetime.now().date().isoformat()
+        condition = Key('user_id').eq(user_id)
+        if when == 'upcoming':
+            condition = condition & Key('date').gte(today)
+        elif when == 'past':
+            condition = condition & Key('date').lt(today)
+
+        query_kwargs = {}
+        if when == 'upcoming':
+            query_kwargs['FilterExpression'] = Attr('status').eq('booked')
+        if start_key:
+            if set(start_key) != {'appointment_id', 'user_id', 'date'} or \
+                    start_key['user_id'] != user_id or \
+                    (when == 'upcoming' and start_key['date'] < today) or \
+                    (when == 'past' and start_key['date'] >= today):
+                raise ValueError('Invalid cursor')
+
+        items = []
+        while True:
+            if start_key:
+                query_kwargs['ExclusiveStartKey'] = start_key
+            response = self.appointments_table.query(
+                IndexName=APPOINTMENTS_USER_INDEX,
+                KeyConditionExpression=condition,
+                ScanIndexForward=(when == 'upcoming'),
+                Limit=limit - len(items),
+                **query_kwargs
+            )
+            items += response['Items']
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key or len(items) >= limit:
+                return items, start_key
+
+    def list_doctor_schedule(self, doctor_id, dates, limit=20, start_key=None):
+        """
+        One ranged query on Care4U_Slots (partition: doctor_id, sort:
+        date#time), so a week's roster costs a request per page no matter
+        how large the appointments table is.
+        """
+        low, high = f"{dates[0]}#", f"{dates[-1]}#~"
+        page_kwargs = {'Limit': limit}
+        if start_key:
+            if set(start_key) != {'doctor_id', 'slot'} or start_key['doctor_id'] != doctor_id or \
+                    not isinstance(start_key['slot'], str) or not low <= start_key['slot'] <= high:
+                raise ValueError('Invalid cursor')
+            page_kwargs['ExclusiveStartKey'] = start_key
+
+        response = self.slots_table.query(
+            KeyConditionExpression=Key('doctor_id').eq(doctor_id) & Key('slot').between(low, high),
+            **page_kwargs
+        )
+        schedule = []
+        for item in response['Items']:
+            appointment_date, appointment_time = item['slot'].split('#', 1)
+            schedule.append({
+                'date': appointment_date,
+                'time': appointment_time,
+                'appointment_id': item['appointment_id'],
+                'user_id': item['user_id']
+            })
+        return schedule, response.get('LastEvaluatedKey')
+
+    def get_occupancy(self, doctor_id, dates):
+        """
+        Reads the doctor's reservations with a single ranged query on
+        Care4U_Slots, so the cost depends on the slots booked in the range,
+        not on the size of the appointments table.
+        """
+        booked = {date: [] for date in dates}
+        query_kwargs = {
+            'KeyConditionExpression': Key('doctor_id').eq(doctor_id) &
+                                      Key('slot').between(f"{dates[0]}#", f"{dates[-1]}#~"),
+            'ProjectionExpression': 'slot'
+        }
+        while True:
+            response = self.slots_table.query(**query_kwargs)
+            for item in response['Items']:
+                appointment_date, appointment_time = item['slot'].split('#', 1)
+                if appointment_date in booked:
+                    booked[appointment_date].append(appointment_time)
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        return {date: occupancy_bitmap(times) for date, times in booked.items()}
+
+    # ----------------------------------------
+    # Waitlists
+    # ----------------------------------------
+    # Care4U_Waitlist has the same key as Care4U_Slots; each item holds the
+    # slot's queue as a list of user_ids, first in line first.
+
+    def get_waitlist(self, doctor_id, date, time):
+        response = self.waitlist_table.get_item(
+            Key={'doctor_id': doctor_id, 'slot': slot_key(date, time)},
+            ConsistentRead=True
+        )
+        return response.get('Item', {}).get('user_ids', [])
+
+    def join_waitlist(self, doctor_id, date, time, user_id):
+        """One conditional list_append on the slot's waitlist item"""
+        try:
+            response = self.waitlist_table.update_item(
+                Key={'doctor_id': doctor_id, 'slot': slot_key(date, time)},
+                UpdateExpression='SET user_ids = list_append(if_not_exists(user_ids, :empty), :user)',
+                ConditionExpression='attribute_not_exists(user_ids) OR '
+                                    '(NOT contains(user_ids, :user_id) AND size(user_ids) < :max_length)',
+                ExpressionAttributeValues={
+                    ':empty': [],
+                    ':user': [user_id],
+                    ':user_id': user_id,
+                    ':max_length': MAX_WAITLIST_LENGTH
+                },
+                ReturnValues='UPDATED_NEW'
+            )
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return None
+        return len(response['Attributes']['user_ids'])
+
+    def leave_waitlist(self, doctor_id, date, time, user_id):
+        key = {'doctor_id': doctor_id, 'slot': slot_key(date, time)}
+        while True:
+            position = waitlist_position(self.get_waitlist(doctor_id, date, time), user_id)
+            if not position:
+                return False
+            try:
+                # The condition fails if the list shifted since we read it
+                self.waitlist_table.update_item(
+                    Key=key,
+                    UpdateExpression=f'REMOVE user_ids[{position - 1}]',
+                    ConditionExpression=f'user_ids[{position - 1}] = :user_id',
+                    ExpressionAttributeValues={':user_id': user_id}
+                )
+                return True
+            except self.client.exceptions.ConditionalCheckFailedException:
+                continue
+
+    def promote_waitlist(self, doctor_id, date, time):
+        """
+        Claiming the slot, creating the appointment and removing the user
+        from the head of the waitlist are one transaction, conditioned on
+        that user still being first, so concurrent promotions can never hand
+        out the same slot twice.
+        """
+        client = self.client
+        key = {'doctor_id': doctor_id, 'slot': slot_key(date, time)}
+        while True:
+            user_ids = self.get_waitlist(doctor_id, date, time)
+            if not user_ids:
+                return None
+            pop_first = {
+                'TableName': WAITLIST_TABLE,
+                'Key': key,
+                'UpdateExpression': 'REMOVE user_ids[0]',
+                'ConditionExpression': 'user_ids[0] = :user_id',
+                'ExpressionAttributeValues': {':user_id': user_ids[0]}
+            }
+
+            if not self.get_user(user_ids[0]):
+                # The account is gone; drop it and offer the slot to the next user
+                try:
+                    client.update_item(**pop_first)
+                except client.exceptions.ConditionalCheckFailedException:
+                    pass
+                continue
+
+            appointment = {
+                'appointment_id': str(uuid.uuid4()),
+                'user_id': user_ids[0],
+                'doctor_id': doctor_id,
+                'date': date,
+                'time': time,
+                'status': 'booked',
+                'created_at': datetime.now().isoformat(),
+                'source': 'waitlist'
+            }
+            try:
+                client.transact_write_items(
+                    TransactItems=reservation_operations(appointment) + [{'Update': pop_first}]
+                )
+            except client.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get('CancellationReasons', [])
+                if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+                    # Booked directly before the waitlist got to it
+                    return None
+                if not is_condition_failure(e):
+                    raise
+                # The waitlist changed since we read it; try again
+                continue
+            return appointment
@@ -0,0 +1,88 @@
+"""
+gunicorn configuration for production
+
+    cd backend
+    gunicorn -c gunicorn.conf.py                    # app.py (DynamoDB + SNS)
+    gunicorn -c gunicorn.conf.py app_local:app      # local storage backends
+
+The app is loaded once in the master process (doctor catalog included)
+and forked into WORKERS processes of THREADS threads each. On SIGTERM or
+SIGINT, workers finish their requests, then deliver queued waitlist
+promotions and notifications before exiting. SIGHUP reloads the workers
+the same way.
+
+    GUNICORN_BIND                   address to listen on (default: 0.0.0.0:5000)
+    GUNICORN_WORKERS                worker processes (default: one per CPU)
+    GUNICORN_THREADS                request threads per worker (default: 8)
+    GUNICORN_WORKER_CLASS           gthread, or gevent after `pip install gevent` (default: gthread)
+    GUNICORN_TIMEOUT                seconds before a stuck worker is restarted (default: 30)
+    GUNICORN_GRACEFUL_TIMEOUT       seconds workers get to finish on shutdown (default: 30)
+    GUNICORN_MAX_REQUESTS           restart workers after this many requests, 0 = never (default: 0)
+    GUNICORN_ACCESS_LOG             access log file, '-' for stdout (default: none)
+
+Password hashing runs in a process pool per worker; unless
+PASSWORD_HASH_WORKERS is set, the CPUs are shared out between workers.
+"""
+
+import multiprocessing
+import os
+import sys
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+wsgi_app = 'app:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', str(CPU_COUNT)))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+# Longer than the notification and waitlist drains in Services.stop()
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+
+# Import the app once in the master; workers share its memory copy-on-write
+preload_app = True
+
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, CPU_COUNT // max(1, workers))))
+
+
+def services_of(flask_app):
+    return flask_app.extensions['care4u']
+
+
+def when_ready(server):
+    """Runs in the master, after the app is loaded and before any worker starts"""
+    services = services_of(server.app.wsgi())
+    if not services.repository.multiprocess and server.num_workers > 1:
+        server.log.warning(f"{services.repository.name} storage is private to each process; "
+                           f"running 1 worker instead of {server.num_workers}")
+        server.num_workers = 1
+    try:
+        services.warm_up()
+    except Exception as e:
+        server.log.warning(f"Could not preload the doctor catalog: {str(e)}")
+
+
+def post_worker_init(worker):
+    """Runs in each worker once the app is loaded"""
+    services = services_of(worker.wsgi)
+    # Start the hashing processes now rather than on the first login
+    services.password_hasher.start()
+
+    # The first worker seeds an empty doctors table (app.py), in the
+    # background so it serves requests meanwhile
+    if worker.age == 1:
+        module = sys.modules.get(worker.app.app_uri.split(':')[0])
+        seed = getattr(module, 'seed_doctors_in_background', None)
+        if seed:
+            seed()
+
+
+def worker_exit(server, worker):
+    """Runs in each worker as it exits: deliver queued background work"""
+    flask_app = getattr(worker, 'wsgi', None)
+    if flask_app is not None:
+        services_of(flask_app).stop()
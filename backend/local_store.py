@@ -0,0 +1,855 @@
+"""
+Local storage backends (see repository.py)
+
+Loads the JSON data files once and keeps them in memory, indexed by
+user_id, email, doctor_id, appointment_id and (doctor_id, date, time),
+plus each user's appointments sorted by date, each doctor's booked slots
+sorted by date and time, and a per-doctor, per-day occupancy bitmap
+(see availability.py).
+Writes are appended to a journal file (one JSON record per line) instead
+of rewriting the full data files on every request. Once the journal holds
+COMPACT_RATIO records per item in the data files, a background thread
+folds it back into them (see LocalStore.compact), so the cost of
+rewriting the files is spread over as many writes as they hold items. On
+startup any journal left over from a previous run is replayed.
+
+Writes are safe across threads and worker processes:
+- all writes go through a single writer thread per process, which commits
+  every write queued while it was busy as one batch (one fsync per batch);
+- each batch runs under an exclusive lock on local_data/.lock, after first
+  catching up on journal records written by other processes, so checks like
+  "is this slot free?" always see the latest data;
+- the JSON data files are replaced atomically (temp file + rename), so a
+  crash can never leave a truncated file behind.
+
+MemoryStore keeps the same indexes without any files, for tests,
+benchmarks and throwaway runs.
+"""
+
+import bisect
+import itertools
+import json
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+
+from availability import slot_bit
+from repository import Repository
+from waitlist import MAX_WAITLIST_LENGTH
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The journal is compacted once it holds COMPACT_RATIO records per item in
+# the data files, and at least COMPACT_MIN_RECORDS
+COMPACT_RATIO = 1
+COMPACT_MIN_RECORDS = 1000
+
+# Maximum number of queued writes committed together
+MAX_BATCH_SIZE = 256
+
+# Primary key of each collection
+COLLECTION_KEYS = {
+    'users': 'user_id',
+    'doctors': 'doctor_id',
+    'appointments': 'appointment_id',
+    'waitlists': 'waitlist_id'
+}
+
+
+# Helper functions for JSON file operations
+def read_json_file(filepath):
+    """
+    Read data from JSON file ([] if it does not exist yet).
+    A corrupt file raises rather than reading as empty, so its data is
+    never compacted away.
+    """
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except json.JSONDecodeError as e:
+        print(f"❌ {filepath} is corrupt ({str(e)}); restore it from a backup before starting")
+        raise
+
+
+def write_json_file(filepath, data):
+    """Write data to JSON file atomically"""
+    replace_file(filepath, json.dumps(data, indent=2))
+
+
+def replace_file(filepath, content):
+    """Replace a file's contents via a synced temp file and an atomic rename"""
+    temp_path = write_temp_file(filepath, content)
+    try:
+        os.replace(temp_path, filepath)
+    except:
+        os.unlink(temp_path)
+        raise
+
+
+def write_temp_file(filepath, content):
+    """
+    Write text or bytes to a synced temp file next to filepath, ready to be
+    renamed over it. Returns the temp file's path.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(content, bytes) else 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+    except:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def journal_header(start):
+    """First line of a compacted journal: the position its first record has in the journal stream"""
+    return json.dumps({'journal_start': start}).encode('utf-8') + b'\n'
+
+
+def parse_journal_header(line):
+    """The start position in a journal's first line, or None if it has no header"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record.get('journal_start') if isinstance(record, dict) else None
+
+
+class FileLock:
+    """Exclusive inter-process lock held on a lock file"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.filepath, 'a+')
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 seconds; keep waiting
+                    continue
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class _Write:
+    """A queued write waiting for the writer thread"""
+
+    def __init__(self, mutation):
+        self.mutation = mutation
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class LocalStore(Repository):
+    """In-memory, indexed view of the local JSON data files"""
+
+    name = 'JSON Files'
+
+    def __init__(self, data_dir, sync=True):
+        self.files = {
+            collection: os.path.join(data_dir, f'{collection}.json')
+            for collection in COLLECTION_KEYS
+        }
+        self.journal_file = os.path.join(data_dir, 'journal.log')
+        os.makedirs(data_dir, exist_ok=True)
+        self.file_lock = FileLock(os.path.join(data_dir, '.lock'))
+        self.sync = sync
+        self._lock = threading.RLock()
+        self._writes = queue.Queue()
+        self._writer = None
+        self._compactor = None
+        self.load()
+
+    # ----------------------------------------
+    # Loading and persistence
+    # ----------------------------------------
+
+    def load(self):
+        """Load the JSON data files and replay the journal"""
+        with self._lock:
+            self._clear()
+            # The journal being read: its (device, inode), the offset read up
+            # to, the records read from it, where its records start in the
+            # journal stream, and the length of its header
+            self.journal_id = None
+            self.journal_offset = 0
+            self.journal_records = 0
+            self.journal_start = 0
+            self.journal_header = 0
+
+            for collection, filepath in self.files.items():
+                for item in read_json_file(filepath):
+                    self._apply(collection, item)
+            self._read_journal(replay=True)
+
+    def _clear(self):
+        """Empty the collections and their indexes"""
+        self.collections = {collection: {} for collection in COLLECTION_KEYS}
+        self.users_by_email = {}
+        self.booked_slots = {}
+        self.occupancy = {}
+        self.appointments_by_user = {}
+        self.slots_by_doctor = {}
+        self._doctor_index = None
+
+    def refresh(self):
+        """Catch up on records written to the journal by other processes"""
+        with self._lock:
+            try:
+                stat = os.stat(self.journal_file)
+            except FileNotFoundError:
+                return
+            journal_id = (stat.st_dev, stat.st_ino)
+            if journal_id == self.journal_id and stat.st_size < self.journal_offset:
+                # Cut short under us; start over from the files
+                self.load()
+            elif journal_id != self.journal_id or stat.st_size > self.journal_offset:
+                if not self._read_journal():
+                    self.load()
+
+    def journal_position(self):
+        """How far into the journal stream (across compactions) this store has read"""
+        return self.journal_start + self.journal_offset - self.journal_header
+
+    def _read_journal(self, replay=False):
+        """
+        Apply complete journal records past the current position.
+        A journal compacted by another process holds the tail of the same
+        journal stream, so reading carries on from this store's position in
+        it (or from its first record, when replaying after loading the data
+        files). Returns False if the compacted journal starts past records
+        this store has not read yet; the store must then be reloaded.
+        """
+        try:
+            f = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            return True
+        with f:
+            stat = os.fstat(f.fileno())
+            journal_id = (stat.st_dev, stat.st_ino)
+            if journal_id != self.journal_id:
+                header = f.readline()
+                start = parse_journal_header(header)
+                if start is None:
+                    start, header = 0, b''
+                if replay:
+                    offset = len(header)
+                elif start <= self.journal_position():
+                    offset = len(header) + self.journal_position() - start
+                else:
+                    return False
+                self.journal_id = journal_id
+                self.journal_start = start
+                self.journal_header = len(header)
+                self.journal_offset = offset
+                # Records this store already has count towards compaction too
+                self.journal_records = f.read(offset - len(header)).count(b'\n')
+            f.seek(self.journal_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Record still being written (or cut short by a crash)
+                    break
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                        collection, item = record['collection'], record['item']
+                    except (ValueError, KeyError, TypeError) as e:
+                        # Writers cut off a torn last record before appending, so
+                        # a bad complete record means the journal is damaged
+                        print(f"❌ {self.journal_file} has a corrupt record at byte {self.journal_offset}; "
+                              f"restore it from a backup before starting")
+                        raise ValueError(f'Corrupt journal record at byte {self.journal_offset}') from e
+                    self._apply(collection, item)
+                    self.journal_records += 1
+                self.journal_offset += len(line)
+        return True
+
+    def compact(self):
+        """
+        Rewrite the JSON data files from memory and start a new journal.
+        Returns False if another process compacted first.
+
+        Only the snapshot and the final renames hold locks, so reads and
+        writes carry on while the files are written:
+        1. under this process's lock, copy the collections as of a position
+           in the journal stream;
+        2. write them to temp files;
+        3. under the file lock, rename the temp files over the data files and
+           replace the journal with its records past that position, headed
+           by the position. Every process keeps reading the new journal from
+           where it was (see _read_journal).
+        A crash before the journal is replaced leaves data files that the
+        old journal replays over correctly, since each record holds a whole
+        item and records are replayed in order.
+        """
+        with self._lock:
+            self.refresh()
+            if self.journal_id is None:
+                return True
+            journal_id, offset, start = self.journal_id, self.journal_offset, self.journal_position()
+            snapshot = {collection: list(items.values()) for collection, items in self.collections.items()}
+
+        temp_paths = {}
+        try:
+            for collection, filepath in self.files.items():
+                temp_paths[filepath] = write_temp_file(filepath, json.dumps(snapshot[collection], indent=2))
+            del snapshot
+
+            with self._lock, self.file_lock:
+                try:
+                    stat = os.stat(self.journal_file)
+                except FileNotFoundError:
+                    return False
+                if (stat.st_dev, stat.st_ino) != journal_id:
+                    return False
+                with open(self.journal_file, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+                # Leave out a torn record left by a writer that crashed mid-append
+                tail = tail[:tail.rfind(b'\n') + 1]
+                for filepath in list(temp_paths):
+                    os.replace(temp_paths.pop(filepath), filepath)
+                replace_file(self.journal_file, journal_header(start) + tail)
+                self.refresh()
+            return True
+        finally:
+            for temp_path in temp_paths.values():
+                os.unlink(temp_path)
+
+    def _compact_in_background(self):
+        """Start compacting on a background thread, unless it is already running"""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self._run_compaction, name='local-store-compactor', daemon=True)
+            self._compactor.start()
+
+    def _run_compaction(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Journal compaction error: {str(e)}")
+
+    def _apply(self, collection, item):
+        """Insert or replace an item and keep the secondary indexes current"""
+        key = item[COLLECTION_KEYS[collection]]
+        previous = self.collections[collection].get(key)
+        self.collections[collection][key] = item
+
+        if collection == 'users':
+            if previous:
+                self.users_by_email.pop(previous['email'], None)
+            self.users_by_email[item['email']] = key
+        elif collection == 'doctors':
+            # Sorted search index is rebuilt on next use
+            self._doctor_index = None
+        elif collection == 'appointments':
+            if previous:
+                keys = self.appointments_by_user[previous['user_id']]
+                keys.pop(bisect.bisect_left(keys, (previous['date'], key)))
+            bisect.insort(self.appointments_by_user.setdefault(item['user_id'], []),
+                          (item['date'], key))
+            if previous and previous.get('status') == 'booked':
+                self.booked_slots.pop(self._slot(previous), None)
+                slots = self.slots_by_doctor[previous['doctor_id']]
+                slot = f"{previous['date']}#{previous['time']}"
+                position = bisect.bisect_left(slots, slot)
+                if position < len(slots) and slots[position] == slot:
+                    slots.pop(position)
+                day = (previous['doctor_id'], previous['date'])
+                self.occupancy[day] = self.occupancy.get(day, 0) & ~slot_bit(previous['time'])
+            if item.get('status') == 'booked':
+                self.booked_slots[self._slot(item)] = key
+                slots = self.slots_by_doctor.setdefault(item['doctor_id'], [])
+                slot = f"{item['date']}#{item['time']}"
+                position = bisect.bisect_left(slots, slot)
+                if position == len(slots) or slots[position] != slot:
+                    slots.insert(position, slot)
+                day = (item['doctor_id'], item['date'])
+                self.occupancy[day] = self.occupancy.get(day, 0) | slot_bit(item['time'])
+
+    @staticmethod
+    def _slot(appointment):
+        return (appointment['doctor_id'], appointment['date'], appointment['time'])
+
+    # ----------------------------------------
+    # Group commit
+    # ----------------------------------------
+
+    def _commit(self, mutation):
+        """
+        Queue a write for the writer thread and wait until it is durable.
+        `mutation` runs on the writer thread with the store up to date and
+        returns (result, records), where records is a list of
+        (collection, item) pairs to persist.
+        """
+        write = _Write(mutation)
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._write_loop, name='local-store-writer', daemon=True)
+                self._writer.start()
+        self._writes.put(write)
+        write.done.wait()
+        if write.error:
+            raise write.error
+        return write.result
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        """Run a batch of writes under the file lock with a single fsync"""
+        try:
+            with self._lock, self.file_lock:
+                self.refresh()
+                if os.path.exists(self.journal_file) and \
+                        os.path.getsize(self.journal_file) > self.journal_offset:
+                    # Torn record left by a writer that crashed mid-append
+                    os.truncate(self.journal_file, self.journal_offset)
+                lines = []
+                for write in batch:
+                    try:
+                        write.result, records = write.mutation()
+                    except Exception as e:
+                        write.error = e
+                        continue
+                    for collection, item in records:
+                        self._apply(collection, item)
+                        lines.append(json.dumps({'collection': collection, 'item': item}) + '\n')
+
+                if lines:
+                    try:
+                        data = ''.join(lines).encode('utf-8')
+                        with open(self.journal_file, 'ab') as f:
+                            f.write(data)
+                            f.flush()
+                            if self.sync:
+                                os.fsync(f.fileno())
+                    except Exception:
+                        # Drop the unpersisted changes from memory
+                        self.load()
+                        raise
+                    self.journal_offset += len(data)
+                    self.journal_records += len(lines)
+
+                # Items in the data files, roughly: those not written since
+                stored = sum(len(items) for items in self.collections.values())
+                in_files = stored - self.journal_records
+                if self.journal_records >= max(COMPACT_MIN_RECORDS, COMPACT_RATIO * in_files):
+                    self._compact_in_background()
+        except Exception as e:
+            for write in batch:
+                write.error = write.error or e
+        finally:
+            for write in batch:
+                write.done.set()
+
+    # ----------------------------------------
+    # Users
+    # ----------------------------------------
+
+    def get_user(self, user_id):
+        self.refresh()
+        return self.collections['users'].get(user_id)
+
+    def find_user_by_email(self, email):
+        self.refresh()
+        user_id = self.users_by_email.get(email)
+        return self.collections['users'].get(user_id) if user_id else None
+
+    def add_user(self, user):
+        """Store a new user. Returns False if the email is already registered."""
+        def mutation():
+            if user['email'] in self.users_by_email:
+                return False, []
+            return True, [('users', user)]
+        return self._commit(mutation)
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        """Replace a user's password hash if it is still old_hash"""
+        def mutation():
+            user = self.collections['users'].get(user_id)
+            if not user or user['password_hash'] != old_hash:
+                return False, []
+            return True, [('users', {**user, 'password_hash': new_hash})]
+        return self._commit(mutation)
+
+    # ----------------------------------------
+    # Doctors
+    # ----------------------------------------
+
+    def list_doctors(self):
+        self.refresh()
+        return list(self.collections['doctors'].values())
+
+    def get_doctor(self, doctor_id):
+        self.refresh()
+        return self.collections['doctors'].get(doctor_id)
+
+    def get_doctors(self, doctor_ids):
+        self.refresh()
+        doctors = self.collections['doctors']
+        return {doctor_id: doctors[doctor_id] for doctor_id in doctor_ids if doctor_id in doctors}
+
+    def put_doctors(self, doctors):
+        def mutation():
+            return len(doctors), [('doctors', doctor) for doctor in doctors]
+        return self._commit(mutation)
+
+    def search_doctors(self, specialization=None, name_prefix=None, limit=20, start_key=None):
+        """
+        Return one page of doctors and the key to resume after (or None).
+        With a specialization, doctors come from a per-specialization index
+        sorted by name; otherwise they are ordered by doctor_id. Keys have the
+        same shape as DynamoDB's LastEvaluatedKey for the equivalent query.
+        Raises ValueError if start_key is malformed.
+        """
+        self.refresh()
+        with self._lock:
+            index = self._doctor_search_index()
+            doctors = self.collections['doctors']
+            try:
+                if specialization:
+                    keys = index['by_specialization'].get(specialization, [])
+                    position = 0
+                    if start_key:
+                        position = bisect.bisect_right(
+                            keys, (start_key['name'], start_key['doctor_id']))
+                    if name_prefix:
+                        position = max(position, bisect.bisect_left(keys, (name_prefix,)))
+                    candidates = itertools.takewhile(
+                        lambda key: not name_prefix or key[0].startswith(name_prefix),
+                        keys[position:])
+                    matches = (doctors[doctor_id] for _, doctor_id in candidates)
+                    key_fields = ('doctor_id', 'specialization', 'name')
+                else:
+                    keys = index['by_id']
+                    position = 0
+                    if start_key:
+                        position = bisect.bisect_right(keys, start_key['doctor_id'])
+                    matches = (doctors[doctor_id] for doctor_id in keys[position:]
+                               if not name_prefix or doctors[doctor_id]['name'].startswith(name_prefix))
+                    key_fields = ('doctor_id',)
+            except (KeyError, TypeError):
+                raise ValueError('Invalid cursor')
+
+            page = list(itertools.islice(matches, limit + 1))
+            if len(page) <= limit:
+                return page, None
+            page = page[:limit]
+            return page, {field: page[-1][field] for field in key_fields}
+
+    def _doctor_search_index(self):
+        if self._doctor_index is None:
+            by_specialization = {}
+            for doctor in self.collections['doctors'].values():
+                by_specialization.setdefault(doctor['specialization'], []).append(
+                    (doctor['name'], doctor['doctor_id']))
+            for keys in by_specialization.values():
+                keys.sort()
+            self._doctor_index = {
+                'by_id': sorted(self.collections['doctors']),
+                'by_specialization': by_specialization
+            }
+        return self._doctor_index
+
+    # ----------------------------------------
+    # Appointments
+    # ----------------------------------------
+
+    def get_appointment(self, appointment_id):
+        self.refresh()
+        return self.collections['appointments'].get(appointment_id)
+
+    def find_booked_appointment(self, doctor_id, date, time):
+        self.refresh()
+        appointment_id = self.booked_slots.get((doctor_id, date, time))
+        return self.get_appointment(appointment_id) if appointment_id else None
+
+    def get_reservation(self, doctor_id, date, time):
+        """The booked appointment holding a slot (None if the slot is free)"""
+        return self.find_booked_appointment(doctor_id, date, time)
+
+    def add_appointments(self, appointments):
+        """Store several new booked appointments in one journal write"""
+        def mutation():
+            failures, records, claimed = {}, [], set()
+            for appointment in appointments:
+                slot = self._slot(appointment)
+                if slot in self.booked_slots or slot in claimed:
+                    failures[appointment['appointment_id']] = 409
+                else:
+                    claimed.add(slot)
+                    records.append(('appointments', appointment))
+            return failures, records
+        return self._commit(mutation)
+
+    def cancel_appointment(self, appointment):
+        """
+        Cancel a booked appointment, releasing its slot. `appointment` is the
+        version the caller read; returns the cancelled appointment, or None
+        if it has changed since (e.g. a concurrent cancel or reschedule).
+        """
+        def mutation():
+            if self.collections['appointments'].get(appointment['appointment_id']) != appointment:
+                return None, []
+            cancelled = {**appointment, 'status': 'cancelled',
+                         'cancelled_at': datetime.now().isoformat()}
+            return cancelled, [('appointments', cancelled)]
+        return self._commit(mutation)
+
+    def reschedule_appointment(self, appointment, new_date, new_time):
+        """
+        Move a booked appointment to a new slot; the old slot is released in
+        the same journal record that claims the new one. `appointment` is the
+        version the caller read; returns the moved appointment, or None if the
+        new slot is taken or the appointment has changed since.
+        """
+        def mutation():
+            if self.collections['appointments'].get(appointment['appointment_id']) != appointment or \
+                    (appointment['doctor_id'], new_date, new_time) in self.booked_slots:
+                return None, []
+            moved = {**appointment, 'date': new_date, 'time': new_time,
+                     'rescheduled_at': datetime.now().isoformat()}
+            return moved, [('appointments', moved)]
+        return self._commit(mutation)
+
+    def list_user_appointments(self, user_id, when=None, limit=20, start_key=None):
+        """
+        Return one page of a user's appointments and the key to resume after.
+        Reads the user's own date-sorted index; 'upcoming' lists booked
+        appointments from today on, soonest first, while 'past' and no filter
+        list the most recent first. Keys have the same shape as DynamoDB's LastEvaluatedKey
+        for the user_id-date-index query.
+        Raises ValueError if start_key does not fit the query.
+        """
+        today = datetime.now().date().isoformat()
+        self.refresh()
+        with self._lock:
+            keys = self.appointments_by_user.get(user_id, [])
+            split = bisect.bisect_left(keys, (today,))
+            start = None
+            try:
+                if start_key:
+                    start = (start_key['date'], start_key['appointment_id'])
+                    if start_key['user_id'] != user_id or \
+                            (when == 'upcoming' and start < (today,)) or \
+                            (when == 'past' and start >= (today,)):
+                        raise ValueError('Invalid cursor')
+            except (KeyError, TypeError):
+                raise ValueError('Invalid cursor')
+
+            appointments = self.collections['appointments']
+            if when == 'upcoming':
+                position = bisect.bisect_right(keys, start) if start else split
+                booked = (appointments[appointment_id] for _, appointment_id in keys[position:]
+                          if appointments[appointment_id].get('status') == 'booked')
+                page = list(itertools.islice(booked, limit + 1))
+            else:
+                end = split if when == 'past' else len(keys)
+                if start:
+                    end = bisect.bisect_left(keys, start)
+                page_keys = keys[max(0, end - limit - 1):end][::-1]
+                page = [appointments[appointment_id] for _, appointment_id in page_keys]
+            if len(page) <= limit:
+                return page, None
+            page = page[:limit]
+            return page, {field: page[-1][field] for field in ('appointment_id', 'user_id', 'date')}
+
+    def list_doctor_schedule(self, doctor_id, dates, limit=20, start_key=None):
+        """
+        Return one page of a doctor's booked slots over a range of dates, in
+        date and time order, and the key to resume after (or None). Keys have
+        the same shape as DynamoDB's LastEvaluatedKey on Care4U_Slots.
+        Raises ValueError if start_key does not fit the query.
+        """
+        low, high = f"{dates[0]}#", f"{dates[-1]}#~"
+        self.refresh()
+        with self._lock:
+            slots = self.slots_by_doctor.get(doctor_id, [])
+            position = bisect.bisect_left(slots, low)
+            if start_key:
+                try:
+                    if start_key['doctor_id'] != doctor_id or not low <= start_key['slot'] <= high:
+                        raise ValueError('Invalid cursor')
+                    position = bisect.bisect_right(slots, start_key['slot'])
+                except (KeyError, TypeError):
+                    raise ValueError('Invalid cursor')
+            end = bisect.bisect_right(slots, high)
+            page_slots = slots[position:min(end, position + limit + 1)]
+
+            schedule = []
+            for slot in page_slots[:limit]:
+                appointment_date, appointment_time = slot.split('#', 1)
+                appointment_id = self.booked_slots[(doctor_id, appointment_date, appointment_time)]
+                schedule.append({
+                    'date': appointment_date,
+                    'time': appointment_time,
+                    'appointment_id': appointment_id,
+                    'user_id': self.collections['appointments'][appointment_id]['user_id']
+                })
+            if len(page_slots) <= limit:
+                return schedule, None
+            return schedule, {'doctor_id': doctor_id, 'slot': page_slots[limit - 1]}
+
+    def get_occupancy(self, doctor_id, dates):
+        """Return {date: occupancy bitmap} for a doctor on the given dates"""
+        self.refresh()
+        return {date: self.occupancy.get((doctor_id, date), 0) for date in dates}
+
+    def add_appointment(self, appointment):
+        """Store a new booked appointment. Returns False if the slot is taken."""
+        def mutation():
+            if self._slot(appointment) in self.booked_slots:
+                return False, []
+            return True, [('appointments', appointment)]
+        return self._commit(mutation)
+
+    # ----------------------------------------
+    # Waitlists
+    # ----------------------------------------
+
+    @staticmethod
+    def _waitlist_id(doctor_id, date, time):
+        return f'{doctor_id}#{date}#{time}'
+
+    def get_waitlist(self, doctor_id, date, time):
+        """The user_ids waiting for a slot, first in line first"""
+        self.refresh()
+        return self._waitlist_users(doctor_id, date, time)
+
+    def _waitlist_users(self, doctor_id, date, time):
+        waitlist = self.collections['waitlists'].get(self._waitlist_id(doctor_id, date, time))
+        return list(waitlist['user_ids']) if waitlist else []
+
+    def _waitlist_record(self, doctor_id, date, time, user_ids):
+        return ('waitlists', {
+            'waitlist_id': self._waitlist_id(doctor_id, date, time),
+            'doctor_id': doctor_id,
+            'date': date,
+            'time': time,
+            'user_ids': user_ids
+        })
+
+    def join_waitlist(self, doctor_id, date, time, user_id):
+        """
+        Append a user to a slot's waitlist. Returns their position, or None
+        if they are already on it or the waitlist is full.
+        """
+        def mutation():
+            user_ids = self._waitlist_users(doctor_id, date, time)
+            if user_id in user_ids or len(user_ids) >= MAX_WAITLIST_LENGTH:
+                return None, []
+            user_ids.append(user_id)
+            return len(user_ids), [self._waitlist_record(doctor_id, date, time, user_ids)]
+        return self._commit(mutation)
+
+    def leave_waitlist(self, doctor_id, date, time, user_id):
+        """Remove a user from a slot's waitlist. Returns False if they were not on it."""
+        def mutation():
+            user_ids = self._waitlist_users(doctor_id, date, time)
+            if user_id not in user_ids:
+                return False, []
+            user_ids.remove(user_id)
+            return True, [self._waitlist_record(doctor_id, date, time, user_ids)]
+        return self._commit(mutation)
+
+    def promote_waitlist(self, doctor_id, date, time):
+        """
+        Book a free slot for the first user on its waitlist, skipping users
+        that no longer exist. The new appointment and the shortened waitlist
+        are written together. Returns the appointment, or None if the slot
+        is booked or nobody is waiting.
+        """
+        def mutation():
+            if (doctor_id, date, time) in self.booked_slots:
+                return None, []
+            user_ids = self._waitlist_users(doctor_id, date, time)
+            while user_ids and user_ids[0] not in self.collections['users']:
+                user_ids.pop(0)
+            if not user_ids:
+                return None, []
+            appointment = {
+                'appointment_id': str(uuid.uuid4()),
+                'user_id': user_ids.pop(0),
+                'doctor_id': doctor_id,
+                'date': date,
+                'time': time,
+                'status': 'booked',
+                'created_at': datetime.now().isoformat(),
+                'source': 'waitlist'
+            }
+            return appointment, [
+                self._waitlist_record(doctor_id, date, time, user_ids),
+                ('appointments', appointment)
+            ]
+        return self._commit(mutation)
+
+
+class MemoryStore(LocalStore):
+    """
+    LocalStore without files: the same indexes and write semantics, but
+    writes are applied in place and nothing survives the process
+    """
+
+    name = 'In-memory'
+    multiprocess = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def load(self):
+        with self._lock:
+            self._clear()
+
+    def refresh(self):
+        pass
+
+    def compact(self):
+        pass
+
+    def _commit(self, mutation):
+        with self._lock:
+            result, records = mutation()
+            for collection, item in records:
+                self._apply(collection, item)
+            return result
@@ -0,0 +1,257 @@
+"""
+In-process metrics in the Prometheus text format
+
+Each app instance keeps a Metrics registry (see application.py) with:
+
+    care4u_http_request_duration_seconds    histogram by method, route and status
+    care4u_dependency_duration_seconds      histogram by dependency and operation
+                                            (storage, notifications, password_hasher)
+    care4u_dependency_errors_total          exceptions raised by those calls
+    care4u_dynamodb_consumed_capacity_total capacity units by table and operation
+    care4u_requests_rejected_total          requests refused by rate limits or load shedding, by reason
+    gauges for queue depths and requests in flight
+
+GET /metrics returns them for Prometheus to scrape. Values are kept per
+process; with several worker processes each one reports its own, so
+scrape them individually or sum across instances.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(names, values, extra=''):
+    """{name="value",...} with Prometheus escaping, or '' without labels"""
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+# ============================================
+# METRIC TYPES
+# ============================================
+
+class Counter:
+    """Thread-safe counter with one series per combination of label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{format_labels(self.labels, key)} {format_value(value)}'
+
+
+class Histogram:
+    """
+    Thread-safe histogram: per series, the count of observations in each
+    bucket plus their sum. Rendered with cumulative buckets, as Prometheus
+    expects.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        # Buckets are "less than or equal", so a value equal to a bound goes in it
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            series['counts'][index] += 1
+            series['sum'] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(value['counts']), value['sum'])
+                            for key, value in self._series.items())
+        bounds = self.buckets + (float('inf'),)
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{format_value(float(bound))}"'
+                yield f'{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}'
+            yield f'{self.name}_count{format_labels(self.labels, key)} {cumulative}'
+
+
+class Gauge:
+    """A value read from `function` each time the metrics are collected"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def samples(self):
+        yield f'{self.name} {format_value(self.function())}'
+
+
+# ============================================
+# REGISTRY
+# ============================================
+
+class Metrics:
+    """The metrics of one app instance"""
+
+    def __init__(self):
+        self.http_requests = Histogram(
+            'care4u_http_request_duration_seconds', 'HTTP request latency',
+            labels=('method', 'route', 'status'))
+        self.dependency_calls = Histogram(
+            'care4u_dependency_duration_seconds', 'Latency of storage, notification and hashing calls',
+            labels=('dependency', 'operation'))
+        self.dependency_errors = Counter(
+            'care4u_dependency_errors_total', 'Storage, notification and hashing calls that raised',
+            labels=('dependency', 'operation', 'error'))
+        self.dynamodb_capacity = Counter(
+            'care4u_dynamodb_consumed_capacity_total', 'DynamoDB capacity units consumed',
+            labels=('table', 'operation'))
+        self.rejected_requests = Counter(
+            'care4u_requests_rejected_total', 'Requests refused by rate limits or load shedding',
+            labels=('reason',))
+        self._metrics = [self.http_requests, self.dependency_calls, self.dependency_errors,
+                         self.dynamodb_capacity, self.rejected_requests]
+
+    def add_gauge(self, name, documentation, function):
+        self._metrics.append(Gauge(name, documentation, function))
+
+    @contextmanager
+    def timed(self, dependency, operation):
+        """
+        Time a block as one call to a dependency, counting exceptions as
+        errors. DynamoDB capacity consumed inside the block is counted here.
+        """
+        started = time.perf_counter()
+        token = _current_metrics.set(self)
+        try:
+            yield
+        except Exception as e:
+            self.dependency_errors.inc(dependency=dependency, operation=operation, error=type(e).__name__)
+            raise
+        finally:
+            _current_metrics.reset(token)
+            self.dependency_calls.observe(time.perf_counter() - started,
+                                          dependency=dependency, operation=operation)
+
+    def instrument(self, target, dependency):
+        """Wrap an object so each of its public method calls is timed (see Instrumented)"""
+        return Instrumented(target, dependency, self)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumented:
+    """
+    Stand-in for an object (the repository, a notification transport) that
+    times every call of its public methods as `dependency` operations named
+    after the method. Other attributes pass through unchanged.
+    """
+
+    def __init__(self, target, dependency, metrics):
+        self._target = target
+        self._dependency = dependency
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        def timed_call(*args, **kwargs):
+            with self._metrics.timed(self._dependency, name):
+                return attribute(*args, **kwargs)
+
+        # Later lookups find the wrapper directly
+        self.__dict__[name] = timed_call
+        return timed_call
+
+
+# ============================================
+# DYNAMODB CONSUMED CAPACITY
+# ============================================
+
+# Operations that report consumed capacity when asked to
+CAPACITY_OPERATIONS = {'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+                       'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems'}
+
+# The Metrics of the timed() call running in this thread (or context)
+_current_metrics = ContextVar('care4u_current_metrics', default=None)
+
+
+def request_consumed_capacity(params, model, **kwargs):
+    """botocore handler: ask DynamoDB to return the capacity each call consumes"""
+    if model.name in CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def record_consumed_capacity(parsed, model, **kwargs):
+    """
+    botocore handler that adds the capacity a DynamoDB call consumed to the
+    Metrics whose timed() block made the call. Clients are shared by every
+    app in the process, so the registry is looked up per call rather than
+    bound when the handler is registered; calls made outside any timed()
+    block (e.g. seeding scripts) are not counted.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return
+    consumed = parsed.get('ConsumedCapacity') if isinstance(parsed, dict) else None
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    for entry in consumed or []:
+        metrics.dynamodb_capacity.inc(entry.get('CapacityUnits', 0),
+                                      table=entry.get('TableName', 'unknown'), operation=model.name)
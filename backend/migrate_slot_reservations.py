@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+DynamoDB Slot Reservation Migration Script
+This script creates the Care4U_Slots table (if needed) and backfills one
+reservation item for every booked appointment in Care4U_Appointments, so
+slots booked before the upgrade stay protected against double booking.
+Safe to run more than once: existing reservations are left untouched.
+"""
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from aws_clients import AWS_REGION, get_resource
+
+# AWS Configuration (see aws_clients.py)
+REGION = AWS_REGION
+APPOINTMENTS_TABLE_NAME = 'Care4U_Appointments'
+SLOTS_TABLE_NAME = 'Care4U_Slots'
+
+
+def ensure_slots_table(dynamodb):
+    """Create the Care4U_Slots table if it does not exist yet"""
+    client = dynamodb.meta.client
+    try:
+        client.describe_table(TableName=SLOTS_TABLE_NAME)
+        print(f"✓ Table {SLOTS_TABLE_NAME} already exists")
+    except client.exceptions.ResourceNotFoundException:
+        print(f"Creating table {SLOTS_TABLE_NAME}...")
+        client.create_table(
+            TableName=SLOTS_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'doctor_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'slot', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'doctor_id', 'AttributeType': 'S'},
+                {'AttributeName': 'slot', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.get_waiter('table_exists').wait(TableName=SLOTS_TABLE_NAME)
+        print(f"✓ Table {SLOTS_TABLE_NAME} created")
+    return dynamodb.Table(SLOTS_TABLE_NAME)
+
+
+def scan_booked_appointments(appointments_table):
+    """Yield every booked appointment, following scan pagination"""
+    scan_kwargs = {
+        'FilterExpression': Attr('status').eq('booked')
+    }
+    while True:
+        response = appointments_table.scan(**scan_kwargs)
+        for item in response['Items']:
+            yield item
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def migrate_slot_reservations():
+    """Backfill Care4U_Slots from the existing booked appointments"""
+    try:
+        dynamodb = get_resource('dynamodb')
+        appointments_table = dynamodb.Table(APPOINTMENTS_TABLE_NAME)
+        slots_table = ensure_slots_table(dynamodb)
+
+        print(f"Backfilling {SLOTS_TABLE_NAME} from {APPOINTMENTS_TABLE_NAME}...")
+
+        added_count = 0
+        existing_count = 0
+        conflicts = []
+        for appointment in scan_booked_appointments(appointments_table):
+            key = {
+                'doctor_id': appointment['doctor_id'],
+                'slot': f"{appointment['date']}#{appointment['time']}"
+            }
+            try:
+                slots_table.put_item(
+                    Item={
+                        **key,
+                        'appointment_id': appointment['appointment_id'],
+                        'user_id': appointment['user_id']
+                    },
+                    ConditionExpression='attribute_not_exists(slot)'
+                )
+                added_count += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                owner = slots_table.get_item(Key=key)['Item']['appointment_id']
+                if owner == appointment['appointment_id']:
+                    existing_count += 1
+                else:
+                    conflicts.append((key, appointment['appointment_id'], owner))
+
+        print(f"\n{'='*60}")
+        print(f"Migration complete: {added_count} added, {existing_count} already present")
+        print(f"{'='*60}")
+
+        for key, appointment_id, owner in conflicts:
+            print(f"✗ Double booking {key['doctor_id']} {key['slot']}: "
+                  f"appointment {appointment_id} (slot held by {owner})")
+
+        return not conflicts
+
+    except ClientError as e:
+        print(f"Error accessing DynamoDB: {e.response['Error']['Message']}")
+        return False
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        return False
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("Care_4_U Hospitals - Slot Reservation Migration")
+    print("="*60)
+    print(f"Region: {REGION}")
+    print(f"Appointments table: {APPOINTMENTS_TABLE_NAME}")
+    print(f"Slots table: {SLOTS_TABLE_NAME}")
+    print("="*60)
+
+    success = migrate_slot_reservations()
+
+    if success:
+        print("\n✓ All booked slots reserved!")
+        exit(0)
+    else:
+        print("\n✗ Migration completed with errors")
+        exit(1)
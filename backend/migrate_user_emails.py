@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+DynamoDB User Email Index Migration Script
+This script creates the Care4U_UserEmails table (if needed) and backfills
+one email -> user_id item for every existing user in Care4U_Users.
+Safe to run more than once: existing email items are left untouched.
+"""
+
+from botocore.exceptions import ClientError
+
+from aws_clients import AWS_REGION, get_resource
+
+# AWS Configuration (see aws_clients.py)
+REGION = AWS_REGION
+USERS_TABLE_NAME = 'Care4U_Users'
+EMAILS_TABLE_NAME = 'Care4U_UserEmails'
+
+
+def ensure_emails_table(dynamodb):
+    """Create the Care4U_UserEmails table if it does not exist yet"""
+    client = dynamodb.meta.client
+    try:
+        client.describe_table(TableName=EMAILS_TABLE_NAME)
+        print(f"✓ Table {EMAILS_TABLE_NAME} already exists")
+    except client.exceptions.ResourceNotFoundException:
+        print(f"Creating table {EMAILS_TABLE_NAME}...")
+        client.create_table(
+            TableName=EMAILS_TABLE_NAME,
+            KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.get_waiter('table_exists').wait(TableName=EMAILS_TABLE_NAME)
+        print(f"✓ Table {EMAILS_TABLE_NAME} created")
+    return dynamodb.Table(EMAILS_TABLE_NAME)
+
+
+def scan_users(users_table):
+    """Yield every user (user_id and email only), following scan pagination"""
+    scan_kwargs = {
+        'ProjectionExpression': 'user_id, email'
+    }
+    while True:
+        response = users_table.scan(**scan_kwargs)
+        for item in response['Items']:
+            yield item
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def migrate_user_emails():
+    """Backfill Care4U_UserEmails from the existing Care4U_Users data"""
+    try:
+        dynamodb = get_resource('dynamodb')
+        users_table = dynamodb.Table(USERS_TABLE_NAME)
+        emails_table = ensure_emails_table(dynamodb)
+
+        print(f"Backfilling {EMAILS_TABLE_NAME} from {USERS_TABLE_NAME}...")
+
+        added_count = 0
+        existing_count = 0
+        conflicts = []
+        for user in scan_users(users_table):
+            email = user.get('email', '').lower().strip()
+            if not email:
+                continue
+            try:
+                emails_table.put_item(
+                    Item={'email': email, 'user_id': user['user_id']},
+                    ConditionExpression='attribute_not_exists(email)'
+                )
+                added_count += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                owner = emails_table.get_item(Key={'email': email})['Item']['user_id']
+                if owner == user['user_id']:
+                    existing_count += 1
+                else:
+                    conflicts.append((email, user['user_id'], owner))
+
+        print(f"\n{'='*60}")
+        print(f"Migration complete: {added_count} added, {existing_count} already present")
+        print(f"{'='*60}")
+
+        for email, user_id, owner in conflicts:
+            print(f"✗ Duplicate email {email}: user {user_id} (indexed to {owner})")
+
+        return not conflicts
+
+    except ClientError as e:
+        print(f"Error accessing DynamoDB: {e.response['Error']['Message']}")
+        return False
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        return False
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("Care_4_U Hospitals - User Email Index Migration")
+    print("="*60)
+    print(f"Region: {REGION}")
+    print(f"Users table: {USERS_TABLE_NAME}")
+    print(f"Email table: {EMAILS_TABLE_NAME}")
+    print("="*60)
+
+    success = migrate_user_emails()
+
+    if success:
+        print("\n✓ All users indexed by email!")
+        exit(0)
+    else:
+        print("\n✗ Migration completed with errors")
+        exit(1)
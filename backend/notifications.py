@@ -0,0 +1,207 @@
+"""
+Background notification pipeline
+
+Request handlers enqueue notifications and return immediately; worker
+threads deliver them in batches through a pluggable transport, retrying
+failed deliveries with exponential backoff. Transports:
+- SnsTransport: publishes to the SNS topic (PublishBatch, up to 10 per call)
+- ConsoleTransport: prints mock emails to the console (local development)
+- MemoryTransport: keeps sent notifications in a list (tests and benchmarks)
+"""
+
+import queue
+import threading
+import time
+
+from background import BackgroundWorkers
+
+# SNS PublishBatch accepts at most 10 entries per call
+SNS_BATCH_LIMIT = 10
+
+
+class Notification:
+    """A message to deliver to a patient"""
+
+    def __init__(self, subject, message, recipient=None):
+        self.subject = subject
+        self.message = message
+        self.recipient = recipient
+        self.attempts = 0
+
+
+def appointment_message(user, doctor, appointment, headline):
+    """Standard patient email body around an appointment's details"""
+    return f"""Dear {user['name']},
+
+{headline}
+
+Appointment Details:
+- Doctor: Dr. {doctor['name']}
+- Specialization: {doctor['specialization']}
+- Date: {appointment['date']}
+- Time: {appointment['time']}
+- Appointment ID: {appointment['appointment_id']}
+
+Thank you for choosing Care_4_U Hospitals.
+
+Best regards,
+Care_4_U Hospitals Team"""
+
+
+def appointment_confirmation(user, doctor, appointment):
+    """Build the booking confirmation sent to the patient"""
+    return Notification(
+        subject='Appointment Confirmation - Care_4_U Hospitals',
+        message=appointment_message(user, doctor, appointment,
+                                    'Your appointment has been confirmed!'),
+        recipient=user.get('email')
+    )
+
+
+def waitlist_promotion(user, doctor, appointment):
+    """Build the notice sent when a waitlisted patient is given a released slot"""
+    return Notification(
+        subject='Appointment Confirmation - Care_4_U Hospitals',
+        message=appointment_message(
+            user, doctor, appointment,
+            'Good news! A slot you were waitlisted for opened up and has been booked for you.'),
+        recipient=user.get('email')
+    )
+
+
+def appointment_cancellation(user, doctor, appointment):
+    """Build the notice sent when a patient cancels an appointment"""
+    return Notification(
+        subject='Appointment Cancelled - Care_4_U Hospitals',
+        message=appointment_message(user, doctor, appointment,
+                                    'Your appointment has been cancelled.'),
+        recipient=user.get('email')
+    )
+
+
+def appointment_rescheduled(user, doctor, appointment, previous):
+    """Build the notice sent when an appointment moves to a new slot"""
+    headline = (f"Your appointment on {previous['date']} at {previous['time']} "
+                f"has been rescheduled.")
+    return Notification(
+        subject='Appointment Rescheduled - Care_4_U Hospitals',
+        message=appointment_message(user, doctor, appointment, headline),
+        recipient=user.get('email')
+    )
+
+
+# ============================================
+# TRANSPORTS
+# ============================================
+
+class SnsTransport:
+    """Publish notifications to an SNS topic"""
+
+    def __init__(self, sns_client, topic_arn):
+        self.sns_client = sns_client
+        self.topic_arn = topic_arn
+
+    def send(self, notifications):
+        """
+        Publish a batch of notifications.
+        Returns the notifications that failed and are worth retrying.
+        """
+        retry = []
+        for start in range(0, len(notifications), SNS_BATCH_LIMIT):
+            chunk = notifications[start:start + SNS_BATCH_LIMIT]
+            response = self.sns_client.publish_batch(
+                TopicArn=self.topic_arn,
+                PublishBatchRequestEntries=[
+                    {
+                        'Id': str(index),
+                        'Subject': notification.subject,
+                        'Message': notification.message
+                    }
+                    for index, notification in enumerate(chunk)
+                ]
+            )
+            for failure in response.get('Failed', []):
+                notification = chunk[int(failure['Id'])]
+                print(f"SNS notification error: {failure.get('Code')} {failure.get('Message', '')}")
+                if not failure.get('SenderFault'):
+                    retry.append(notification)
+        return retry
+
+
+class ConsoleTransport:
+    """Print notifications as mock emails (local development)"""
+
+    def send(self, notifications):
+        for notification in notifications:
+            print(f"\n{'='*60}")
+            print(f"📧 EMAIL NOTIFICATION (MOCK)")
+            print(f"{'='*60}")
+            print(f"To: {notification.recipient}")
+            print(f"Subject: {notification.subject}")
+            print(f"\n{notification.message}")
+            print(f"{'='*60}\n")
+        return []
+
+
+class MemoryTransport:
+    """Keep delivered notifications in memory (tests and benchmarks)"""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, notifications):
+        with self._lock:
+            self.sent.extend(notifications)
+        return []
+
+
+# ============================================
+# DISPATCHER
+# ============================================
+
+class NotificationDispatcher(BackgroundWorkers):
+    """
+    Deliver notifications from an in-process queue on worker threads.
+    Each worker takes up to `batch_size` queued notifications at a time and
+    retries failures with exponential backoff and jitter, giving up after
+    `max_attempts` (see background.py for the worker lifecycle).
+    """
+
+    thread_name = 'notifications'
+    unfinished_message = 'notifications not delivered'
+
+    def __init__(self, transport, workers=2, batch_size=SNS_BATCH_LIMIT,
+                 max_attempts=5, base_delay=0.5, max_delay=30, max_queue_size=10000):
+        super().__init__(workers=workers, batch_size=batch_size, max_attempts=max_attempts,
+                         base_delay=base_delay, max_delay=max_delay, max_queue_size=max_queue_size)
+        self.transport = transport
+
+    def enqueue(self, notification):
+        """Queue a notification. Returns False if the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(notification)
+            return True
+        except queue.Full:
+            print(f"Notification queue full; dropped: {notification.subject}")
+            return False
+
+    def process(self, batch):
+        """Send a batch, retrying failures with exponential backoff"""
+        while batch:
+            for notification in batch:
+                notification.attempts += 1
+            try:
+                failed = self.transport.send(batch)
+            except Exception as e:
+                print(f"Notification delivery error: {str(e)}")
+                failed = batch
+
+            batch = [n for n in failed if n.attempts < self.max_attempts]
+            for notification in failed:
+                if notification.attempts >= self.max_attempts:
+                    print(f"Notification dropped after {notification.attempts} attempts: "
+                          f"{notification.subject}")
+            if batch:
+                time.sleep(self.retry_delay(max(n.attempts for n in batch)))
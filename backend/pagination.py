@@ -0,0 +1,49 @@
+"""
+Cursor pagination helpers shared by app.py and app_local.py
+
+A cursor is the key of the last item on the previous page (DynamoDB's
+LastEvaluatedKey, or the equivalent key in the local store), encoded as
+URL-safe base64 JSON so clients can pass it back unchanged.
+"""
+
+import base64
+import binascii
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a page size query parameter. Raises ValueError if out of range."""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def encode_cursor(key):
+    """Encode a last-evaluated key as an opaque cursor (None stays None)"""
+    if not key:
+        return None
+    encoded = base64.urlsafe_b64encode(json.dumps(key, default=str).encode('utf-8'))
+    return encoded.decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into a key. Raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, dict):
+        raise ValueError('Invalid cursor')
+    return key
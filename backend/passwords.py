@@ -0,0 +1,148 @@
+"""
+Password hashing off the request thread
+
+PBKDF2/scrypt are deliberately CPU-heavy, so hashing and verification run
+in a bounded process pool instead of on the web worker's thread. The
+algorithm and cost are configurable, and hashes made with older settings
+are upgraded on the next successful login.
+
+    PASSWORD_HASH_METHOD         werkzeug method string (default: pbkdf2:sha256:600000),
+                                 e.g. scrypt:32768:8:1 or pbkdf2:sha256:1000000
+    PASSWORD_HASH_WORKERS        hashing processes (default: CPU count; 0 = hash inline)
+    PASSWORD_HASH_MAX_PENDING    hashes queued or running before new requests are
+                                 turned away at once (default: 4 per worker)
+    PASSWORD_HASH_TIMEOUT        seconds to wait for a result (default: 10)
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get(
+    'PASSWORD_HASH_MAX_PENDING', str(max(1, PASSWORD_HASH_WORKERS) * 4)))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the hashing pool is saturated (max_pending hashes already
+    queued or running, or no result within the timeout); the caller should
+    answer 503
+    """
+
+
+# ============================================
+# WORKER FUNCTIONS (run in the pool processes)
+# ============================================
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password, method):
+    """Check a password and, if it is valid but outdated, compute its new hash"""
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if _hash_settings(password_hash) != _method_settings(method):
+        return True, _hash(password, method)
+    return True, None
+
+
+def _hash_settings(password_hash):
+    """The method part of a werkzeug hash, e.g. 'pbkdf2:sha256:600000'"""
+    return password_hash.split('$', 1)[0]
+
+
+_method_settings_cache = {}
+
+
+def _method_settings(method):
+    """
+    The settings werkzeug records for a method, with its defaults filled in
+    (e.g. 'scrypt' -> 'scrypt:32768:8:1'). Computed once per process.
+    """
+    if method not in _method_settings_cache:
+        _method_settings_cache[method] = _hash_settings(_hash('', method))
+    return _method_settings_cache[method]
+
+
+# ============================================
+# PUBLIC API
+# ============================================
+
+class PasswordHasher:
+    """Run password hashing in a bounded process pool"""
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, timeout=PASSWORD_HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = None
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        """Hash a new password with the configured method"""
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """
+        Check a password against its stored hash.
+        Returns (valid, new_hash); new_hash is set when the stored hash uses
+        outdated settings and should be replaced.
+        """
+        return self._run(_verify, password_hash, password, self.method)
+
+    def start(self):
+        """Start the worker processes now instead of on the first login"""
+        self._run(_method_settings, self.method)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _run(self, function, *args):
+        if self.workers <= 0:
+            return function(*args)
+
+        pool, slots = self._get_pool()
+        # A full pool turns requests away at once instead of queueing them
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = pool.submit(function, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot stays taken until the hash is done, even if we stop waiting
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Drop it if it has not started; a running hash still finishes
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def _get_pool(self):
+        """This process's pool and the semaphore of its max_pending slots"""
+        pid = os.getpid()
+        if self._pool is None or self._pid != pid:
+            with self._lock:
+                if self._pool is None or self._pid != pid:
+                    # A forked child cannot use its parent's pool (or slots
+                    # taken by the parent's hashes)
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+                    self._pid = pid
+        return self._pool, self._slots
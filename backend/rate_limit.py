@@ -0,0 +1,232 @@
+"""
+Request rate limiting and load shedding
+
+A token bucket per key (e.g. per email address): each request takes one
+token, tokens refill at a steady rate up to the bucket's capacity, and a
+request that finds the bucket empty is refused with the number of seconds
+until the next token is available.
+
+Buckets live in a bucket store. MemoryBucketStore keeps them in the
+process, so each server process enforces its own limits; SQLiteBucketStore
+keeps them in a database file that every worker process on the host
+shares. Other shared stores (e.g. Redis) only need the same take() method.
+
+    RATE_LIMIT_BACKEND        memory | sqlite (default: memory)
+    RATE_LIMIT_SQLITE_PATH    database of the sqlite store (default: local_data/rate_limits.db)
+
+LoadShedder refuses work while the process is overloaded (see below).
+"""
+
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from flask import jsonify
+
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH', os.path.join('local_data', 'rate_limits.db'))
+
+# How often buckets that have filled up again are forgotten (seconds)
+_PRUNE_INTERVAL = 60
+
+
+def refill(available, elapsed, capacity, refill_per_second):
+    return min(capacity, available + max(0, elapsed) * refill_per_second)
+
+
+# ============================================
+# BUCKET STORES
+# ============================================
+
+class MemoryBucketStore:
+    """Token buckets in this process's memory"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def take(self, key, tokens, capacity, refill_per_second):
+        """
+        Take tokens from the key's bucket.
+        Returns 0 if they were taken, otherwise the seconds until there are enough.
+        """
+        now = time.monotonic()
+        with self._lock:
+            available, updated, _ = self._buckets.get(key, (capacity, now, now))
+            available = refill(available, now - updated, capacity, refill_per_second)
+            if available >= tokens:
+                available -= tokens
+                retry_after = 0
+            else:
+                retry_after = (tokens - available) / refill_per_second
+            full_at = now + (capacity - available) / refill_per_second
+            self._buckets[key] = (available, now, full_at)
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now):
+        if now - self._last_prune < _PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a SQLite database, shared by every process that opens
+    the same file (e.g. the gunicorn workers of one server)
+    """
+
+    def __init__(self, path, busy_timeout=5):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._last_prune = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)')
+
+    def _connection(self):
+        """This thread's connection, opened on first use (and again after a fork)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            # Losing the last few bucket updates in a power cut is harmless
+            connection.execute('PRAGMA synchronous = OFF')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def take(self, key, tokens, capacity, refill_per_second):
+        """Same as MemoryBucketStore.take(), atomically across processes"""
+        # Wall-clock time, since monotonic clocks differ between processes
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            available = refill(row[0], now - row[1], capacity, refill_per_second) if row else capacity
+            if available >= tokens:
+                available -= tokens
+                retry_after = 0
+            else:
+                retry_after = (tokens - available) / refill_per_second
+            full_at = now + (capacity - available) / refill_per_second
+            connection.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)',
+                               (key, available, now, full_at))
+            if now - self._last_prune >= _PRUNE_INTERVAL:
+                self._last_prune = now
+                connection.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return retry_after
+
+
+def create_bucket_store(backend=None, path=None):
+    """The bucket store for RATE_LIMIT_BACKEND (or `backend`)"""
+    backend = backend or RATE_LIMIT_BACKEND
+    if backend == 'memory':
+        return MemoryBucketStore()
+    if backend == 'sqlite':
+        return SQLiteBucketStore(path or RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unknown rate limit backend {backend!r} (expected memory or sqlite)")
+
+
+# ============================================
+# LIMITERS
+# ============================================
+
+class TokenBucketLimiter:
+    """
+    Token buckets of one size, keyed by an arbitrary string, in a bucket
+    store (in memory by default). A limiter with no refill rate allows
+    everything.
+    """
+
+    def __init__(self, capacity, refill_per_second, store=None, name='default'):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.store = store or MemoryBucketStore()
+        # Keeps this limiter's keys apart from other limiters' in a shared store
+        self.name = name
+
+    @property
+    def enabled(self):
+        return self.refill_per_second > 0 and self.capacity > 0
+
+    def acquire(self, key, tokens=1):
+        """
+        Take tokens from the key's bucket.
+        Returns 0 if the request is allowed, otherwise the seconds to wait.
+        """
+        if not self.enabled:
+            return 0
+        return self.store.take(f'{self.name}:{key}', tokens, self.capacity, self.refill_per_second)
+
+
+class LoadShedder:
+    """
+    Admission control for one process: refuse new requests while
+    - max_in_flight requests are already being handled, or
+    - recent requests to the same endpoint have been slower than max_latency
+      seconds on average (an exponentially weighted moving average, kept
+      per endpoint so slow logins do not shed fast bookings), or
+    - queue_depth() (e.g. undelivered notifications) has reached max_queue_depth.
+    While latency is over the limit, a share of requests that grows with the
+    excess (at most 90%) is refused, so the others keep measuring it.
+    A limit of 0 disables that check.
+    """
+
+    def __init__(self, max_in_flight=0, max_latency=0, queue_depth=None, max_queue_depth=0, smoothing=0.1):
+        self.max_in_flight = max_in_flight
+        self.max_latency = max_latency
+        self.queue_depth = queue_depth
+        self.max_queue_depth = max_queue_depth
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.average_latency = {}
+        self._lock = threading.Lock()
+
+    def admit(self, endpoint=None):
+        """
+        Start a request to an endpoint. Returns 0 if it is admitted (call
+        release() when it ends), otherwise the seconds after which to retry.
+        """
+        if self.max_queue_depth and self.queue_depth and self.queue_depth() >= self.max_queue_depth:
+            return 5
+        with self._lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                return 1
+            average_latency = self.average_latency.get(endpoint, 0.0)
+            if self.max_latency and average_latency > self.max_latency:
+                excess = (average_latency - self.max_latency) / self.max_latency
+                if random.random() < min(0.9, excess):
+                    return max(1, average_latency)
+            self.in_flight += 1
+        return 0
+
+    def release(self, latency, endpoint=None):
+        """End an admitted request to an endpoint that took `latency` seconds"""
+        with self._lock:
+            self.in_flight -= 1
+            average_latency = self.average_latency.get(endpoint, 0.0)
+            self.average_latency[endpoint] = average_latency + self.smoothing * (latency - average_latency)
+
+
+def rate_limited_response(retry_after, error, status=429):
+    """JSON error response with a Retry-After header (whole seconds, at least 1)"""
+    response = jsonify({
+        'success': False,
+        'error': error
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
@@ -0,0 +1,206 @@
+"""
+Storage interface shared by every backend
+
+The Flask app (see application.py) talks to storage only through a
+Repository, so each route is written once and runs unchanged on:
+
+    dynamodb    DynamoDB tables (dynamodb_repository.py)
+    local       JSON files in local_data/ with a write journal (local_store.py)
+    sqlite      one SQLite database file (sqlite_repository.py)
+    memory      in-process only, nothing persisted (local_store.py)
+
+The backend is picked by the STORAGE_BACKEND environment variable (or the
+`backend` argument of create_repository).
+
+Items are plain dicts with the same fields in every backend. Paginated
+methods return (items, key to resume after or None); keys have the shape
+of DynamoDB's LastEvaluatedKey for the equivalent query, so cursors look
+the same whichever backend issued them.
+"""
+
+import os
+
+STORAGE_BACKENDS = ('dynamodb', 'local', 'sqlite', 'memory')
+
+
+class Repository:
+    """Base class of the storage backends; every method but register_metrics must be overridden"""
+
+    # Shown by /health and the API index
+    name = 'Unknown'
+
+    # Whether several processes (e.g. web server workers) may use the same
+    # storage at once
+    multiprocess = True
+
+    # ----------------------------------------
+    # Users
+    # ----------------------------------------
+
+    def get_user(self, user_id):
+        """A user by id (None if not found)"""
+        raise NotImplementedError
+
+    def find_user_by_email(self, email):
+        """A user by email address, read consistently (None if not found)"""
+        raise NotImplementedError
+
+    def add_user(self, user):
+        """Store a new user. Returns False if the email is already registered."""
+        raise NotImplementedError
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        """Replace a user's password hash if it is still old_hash. Returns True if replaced."""
+        raise NotImplementedError
+
+    # ----------------------------------------
+    # Doctors
+    # ----------------------------------------
+
+    def list_doctors(self):
+        """The full doctor catalog"""
+        raise NotImplementedError
+
+    def get_doctor(self, doctor_id):
+        """A doctor by id (None if not found)"""
+        raise NotImplementedError
+
+    def get_doctors(self, doctor_ids):
+        """{doctor_id: doctor} for the given ids that exist, read together"""
+        raise NotImplementedError
+
+    def search_doctors(self, specialization=None, name_prefix=None, limit=20, start_key=None):
+        """
+        One page of doctors, filtered by specialization and/or name prefix.
+        Raises ValueError if start_key does not fit the query.
+        """
+        raise NotImplementedError
+
+    def put_doctors(self, doctors):
+        """Insert or replace doctors (used for seeding). Returns the number written."""
+        raise NotImplementedError
+
+    # ----------------------------------------
+    # Appointments and slots
+    # ----------------------------------------
+
+    def get_appointment(self, appointment_id):
+        """An appointment by id, read consistently (None if not found)"""
+        raise NotImplementedError
+
+    def get_reservation(self, doctor_id, date, time):
+        """
+        Who holds a slot: a dict with at least appointment_id and user_id,
+        or None if the slot is free
+        """
+        raise NotImplementedError
+
+    def add_appointment(self, appointment):
+        """
+        Store a new booked appointment, atomically with claiming its slot.
+        Returns False if the slot is already booked.
+        """
+        raise NotImplementedError
+
+    def add_appointments(self, appointments):
+        """
+        Store several new booked appointments.
+        Returns {appointment_id: status} for the ones not stored: 409 if the
+        slot is taken (by an existing booking or an earlier one in the list),
+        503 if the write could not complete.
+        """
+        raise NotImplementedError
+
+    def cancel_appointment(self, appointment):
+        """
+        Cancel a booked appointment and release its slot. `appointment` is
+        the version the caller read; returns the cancelled appointment, or
+        None if it has changed since (e.g. a concurrent cancel or reschedule).
+        """
+        raise NotImplementedError
+
+    def reschedule_appointment(self, appointment, new_date, new_time):
+        """
+        Move a booked appointment to a new slot, claiming the new slot and
+        releasing the old one together. Returns the moved appointment, or
+        None if the new slot is taken or the appointment has changed since.
+        """
+        raise NotImplementedError
+
+    def list_user_appointments(self, user_id, when=None, limit=20, start_key=None):
+        """
+        One page of a user's appointments: 'upcoming' lists booked ones from
+        today on (not cancelled ones), soonest first; 'past' and no filter
+        list every status, most recent first.
+        Raises ValueError if start_key does not fit the query.
+        """
+        raise NotImplementedError
+
+    def list_doctor_schedule(self, doctor_id, dates, limit=20, start_key=None):
+        """
+        One page of a doctor's booked slots over a range of dates, in date
+        and time order, as {date, time, appointment_id, user_id}.
+        Raises ValueError if start_key does not fit the query.
+        """
+        raise NotImplementedError
+
+    def get_occupancy(self, doctor_id, dates):
+        """{date: occupancy bitmap} for a doctor (see availability.py)"""
+        raise NotImplementedError
+
+    # ----------------------------------------
+    # Waitlists
+    # ----------------------------------------
+
+    def get_waitlist(self, doctor_id, date, time):
+        """The user_ids waiting for a slot, first in line first"""
+        raise NotImplementedError
+
+    def join_waitlist(self, doctor_id, date, time, user_id):
+        """
+        Append a user to a slot's waitlist. Returns their position, or None
+        if they are already on it or the waitlist is full.
+        """
+        raise NotImplementedError
+
+    def leave_waitlist(self, doctor_id, date, time, user_id):
+        """Remove a user from a slot's waitlist. Returns False if they were not on it."""
+        raise NotImplementedError
+
+    def promote_waitlist(self, doctor_id, date, time):
+        """
+        Book a free slot for the first user on its waitlist, skipping users
+        that no longer exist; booking and leaving the waitlist happen
+        together. Returns the appointment, or None if the slot is booked or
+        nobody is waiting.
+        """
+        raise NotImplementedError
+
+    # ----------------------------------------
+    # Monitoring
+    # ----------------------------------------
+
+    def register_metrics(self, metrics):
+        """Record backend-specific metrics in a Metrics registry (see metrics.py)"""
+
+
+def create_repository(backend=None, data_dir=None):
+    """
+    Build the repository for a storage backend (default: $STORAGE_BACKEND,
+    else 'local'). Backends are imported on demand, so the local ones do
+    not need boto3.
+    """
+    backend = backend or os.environ.get('STORAGE_BACKEND', 'local')
+    if backend == 'dynamodb':
+        from dynamodb_repository import DynamoDBRepository
+        return DynamoDBRepository()
+    if backend == 'local':
+        from local_store import LocalStore
+        return LocalStore(data_dir or 'local_data')
+    if backend == 'sqlite':
+        from sqlite_repository import SQLITE_PATH, SQLiteRepository
+        return SQLiteRepository(SQLITE_PATH or os.path.join(data_dir or 'local_data', 'care4u.db'))
+    if backend == 'memory':
+        from local_store import MemoryStore
+        return MemoryStore()
+    raise ValueError(f"Unknown storage backend {backend!r} (expected one of {', '.join(STORAGE_BACKENDS)})")
@@ -1,78 +1,185 @@
 #!/usr/bin/env python3
 """
 DynamoDB Doctor Data Seeding Script
-This script populates the Care4U_Doctors table with initial doctor data.
+This script populates the Care4U_Doctors table with doctor data.
+
+Doctors are written with batch_writer (25 items per BatchWriteItem call)
+from several threads in parallel, one segment of the input at a time.
+Writes are upserts keyed by doctor_id, so re-running an import updates
+doctors in place instead of duplicating them.
+
+Usage:
+    python seed_doctors.py                      # local_data/doctors.json
+    python seed_doctors.py doctors.csv          # CSV import
+    python seed_doctors.py doctors_dynamodb_format.json --workers 8
+    python seed_doctors.py --if-empty           # only seed an empty table
+
+Supported input files:
+- JSON list of doctors (local_data/doctors.json format)
+- DynamoDB batch-write JSON (doctors_dynamodb_format.json format)
+- CSV with columns doctor_id, name, specialization, available_slots
+  (slots separated by ';' or spaces, e.g. "09:00;10:00;11:00")
 """
 
-import boto3
+import argparse
+import csv
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 
-# AWS Configuration
-REGION = 'us-east-1'
+from aws_clients import AWS_REGION, get_table
+
+# AWS Configuration (see aws_clients.py)
+REGION = AWS_REGION
 TABLE_NAME = 'Care4U_Doctors'
 
-def load_doctor_data():
-    """Load doctor data from JSON file"""
+# Number of parallel writer threads
+DEFAULT_WORKERS = 4
+
+
+def default_data_path():
+    """Path of the bundled local_data/doctors.json file"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(script_dir, 'local_data', 'doctors.json')
-    
-    with open(json_path, 'r') as f:
-        return json.load(f)
+    return os.path.join(script_dir, 'local_data', 'doctors.json')
+
+
+def load_doctor_data(path=None):
+    """Load doctor data from a JSON, DynamoDB batch-write JSON or CSV file"""
+    path = path or default_data_path()
+
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', newline='') as f:
+            return [
+                {
+                    'doctor_id': row['doctor_id'].strip(),
+                    'name': row['name'].strip(),
+                    'specialization': row['specialization'].strip(),
+                    'available_slots': row.get('available_slots', '').replace(';', ' ').split()
+                }
+                for row in csv.DictReader(f)
+                if row.get('doctor_id')
+            ]
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        # DynamoDB batch-write format: {"Care4U_Doctors": [{"PutRequest": {"Item": {...}}}]}
+        deserializer = TypeDeserializer()
+        return [
+            {key: deserializer.deserialize(value) for key, value in request['PutRequest']['Item'].items()}
+            for request in data.get(TABLE_NAME, [])
+            if 'PutRequest' in request
+        ]
+    return data
+
+
+def table_is_empty(table):
+    """Check whether a table has any items, reading at most one key"""
+    response = table.scan(Limit=1, ProjectionExpression='doctor_id')
+    return not response['Items']
+
+
+def import_doctors(doctors, table_name=TABLE_NAME, workers=DEFAULT_WORKERS):
+    """
+    Upsert doctors into DynamoDB in parallel.
+    The list is cut into contiguous segments (about 5% of it each, at least
+    one batch) that `workers` threads write, each through its own boto3
+    resource (resources are not thread-safe). Progress is reported from
+    the calling thread as segments complete.
+    Returns the number of doctors written.
+    """
+    total = len(doctors)
+    if not total:
+        return 0
+
+    segment_size = max(25, -(-total // 20))
+    segments = [doctors[start:start + segment_size] for start in range(0, total, segment_size)]
 
-def seed_doctors():
+    def write_segment(segment):
+        table = get_table(table_name)
+        # overwrite_by_pkeys drops duplicate doctor_ids within a batch
+        with table.batch_writer(overwrite_by_pkeys=['doctor_id']) as batch:
+            for doctor in segment:
+                batch.put_item(Item=doctor)
+        return len(segment)
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(segments)))) as executor:
+        # Each segment runs in a copy of the caller's context, so its writes
+        # count towards the caller's metrics (see metrics.timed)
+        futures = {executor.submit(copy_context().run, write_segment, segment): segment
+                   for segment in segments}
+        for future in as_completed(futures):
+            try:
+                written += future.result()
+            except Exception as e:
+                print(f"✗ Failed to write segment starting at {futures[future][0]['doctor_id']}: {str(e)}")
+                continue
+            print(f"  … {written}/{total} doctors written")
+    return written
+
+
+def seed_doctors(path=None, workers=DEFAULT_WORKERS, if_empty=False):
     """Seed doctors data into DynamoDB table"""
     try:
-        # Initialize DynamoDB resource
-        dynamodb = boto3.resource('dynamodb', region_name=REGION)
-        table = dynamodb.Table(TABLE_NAME)
-        
+        # Initialize DynamoDB table
+        table = get_table(TABLE_NAME)
+
+        if if_empty and not table_is_empty(table):
+            print(f"✓ {TABLE_NAME} already has doctors. Nothing to do.")
+            return True
+
         # Load doctor data
-        doctors = load_doctor_data()
-        
-        print(f"Starting to seed {len(doctors)} doctors into {TABLE_NAME}...")
-        
-        # Insert each doctor
-        success_count = 0
-        for doctor in doctors:
-            try:
-                table.put_item(Item=doctor)
-                print(f"✓ Added: Dr. {doctor['name']} ({doctor['specialization']})")
-                success_count += 1
-            except ClientError as e:
-                print(f"✗ Failed to add Dr. {doctor['name']}: {e.response['Error']['Message']}")
-        
+        doctors = load_doctor_data(path)
+
+        print(f"Starting to seed {len(doctors)} doctors into {TABLE_NAME} ({workers} workers)...")
+
+        success_count = import_doctors(doctors, workers=workers)
+
         print(f"\n{'='*60}")
-        print(f"Seeding complete: {success_count}/{len(doctors)} doctors added successfully")
+        print(f"Seeding complete: {success_count}/{len(doctors)} doctors written successfully")
         print(f"{'='*60}")
-        
-        # Verify by scanning the table
-        response = table.scan()
-        print(f"\nTotal doctors in table: {response['Count']}")
-        
+        print("Running servers pick up the changes once their doctor cache expires "
+              "(DOCTORS_CACHE_TTL).")
+
         return success_count == len(doctors)
-        
+
     except ClientError as e:
         print(f"Error accessing DynamoDB: {e.response['Error']['Message']}")
         return False
     except FileNotFoundError:
-        print("Error: doctors.json file not found in local_data directory")
+        print(f"Error: doctor data file not found: {path or default_data_path()}")
         return False
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         return False
 
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed the Care4U_Doctors table')
+    parser.add_argument('path', nargs='?', help='JSON, DynamoDB JSON or CSV file '
+                                                '(default: local_data/doctors.json)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'parallel writer threads (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--if-empty', action='store_true',
+                        help='only seed when the table has no doctors yet')
+    args = parser.parse_args()
+
     print("="*60)
     print("Care_4_U Hospitals - Doctor Data Seeding Script")
     print("="*60)
     print(f"Region: {REGION}")
     print(f"Table: {TABLE_NAME}")
+    print(f"Source: {args.path or default_data_path()}")
     print("="*60)
-    
-    success = seed_doctors()
-    
+
+    success = seed_doctors(args.path, workers=args.workers, if_empty=args.if_empty)
+
     if success:
         print("\n✓ All doctors seeded successfully!")
         exit(0)
@@ -0,0 +1,78 @@
+"""
+Signed session tokens
+
+Login issues an HMAC-signed token carrying the user's id; authenticated
+endpoints verify the signature and expiry without touching the database.
+Clients send the token as `Authorization: Bearer <token>`.
+
+    SESSION_SECRET_KEY    signing key; must be set and shared by every server
+                          process, or tokens from one process fail on another
+    SESSION_TTL           token lifetime in seconds (default: 43200 = 12 hours)
+"""
+
+import hashlib
+import os
+import secrets
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+SESSION_SECRET_KEY = os.environ.get('SESSION_SECRET_KEY')
+SESSION_TTL = int(os.environ.get('SESSION_TTL', str(12 * 60 * 60)))
+
+
+class SessionManager:
+    """Issue and verify signed, expiring session tokens"""
+
+    def __init__(self, secret_key=SESSION_SECRET_KEY, ttl=SESSION_TTL):
+        if not secret_key:
+            print("⚠️  SESSION_SECRET_KEY is not set; using a random key. "
+                  "Sessions will not survive a restart or work across processes.")
+            secret_key = secrets.token_hex(32)
+        self.ttl = ttl
+        self._serializer = URLSafeTimedSerializer(
+            secret_key,
+            salt='care4u-session',
+            signer_kwargs={'digest_method': hashlib.sha256}
+        )
+
+    def issue(self, user_id):
+        """Create a token for a user"""
+        return self._serializer.dumps({'uid': user_id})
+
+    def verify(self, token):
+        """Return the token's user_id, or None if it is invalid or expired"""
+        if not token:
+            return None
+        try:
+            payload = self._serializer.loads(token, max_age=self.ttl)
+        except BadSignature:
+            return None
+        return payload.get('uid') if isinstance(payload, dict) else None
+
+
+def bearer_token():
+    """The request's `Authorization: Bearer` token, or None"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else None
+
+
+def require_session(sessions):
+    """
+    Decorator for endpoints that need a logged-in user.
+    Sets g.user_id from the bearer token, or answers 401.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = sessions.verify(bearer_token())
+            if not user_id:
+                return jsonify({
+                    'success': False,
+                    'error': 'Authentication required. Please log in again.'
+                }), 401
+            g.user_id = user_id
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,461 @@
+"""
+SQLite storage backend (see repository.py), for single-node deployments
+
+One database file holds every collection. The database itself enforces
+the invariants the other backends check in code:
+
+- a unique index on users.email, so an email can only register once;
+- a partial unique index on appointments (doctor_id, date, time) for
+  booked appointments, so a slot can only be booked once (cancelled
+  appointments drop out of the index and release their slot).
+
+The database runs in WAL mode, so readers never block the writer and
+each commit is a single append to the write-ahead log. Each thread keeps
+its own connection, opened on first use (and again in forked children).
+Writes that read before they write start with BEGIN IMMEDIATE, so
+concurrent writers queue on the database lock instead of failing halfway.
+
+    SQLITE_PATH           database file (default: care4u.db in the data directory)
+    SQLITE_SYNCHRONOUS    FULL (default; every commit survives power loss)
+                          or NORMAL (faster; the last commits may be lost
+                          on power loss, but never corrupted)
+    SQLITE_BUSY_TIMEOUT   seconds to wait for the write lock (default: 5)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from availability import occupancy_bitmap
+from repository import Repository
+from waitlist import MAX_WAITLIST_LENGTH
+
+SQLITE_PATH = os.environ.get('SQLITE_PATH')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'FULL')
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '5'))
+
+# Host parameters per statement, well within SQLite's limit
+MAX_VARIABLES = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS doctors (
+    doctor_id TEXT PRIMARY KEY,
+    specialization TEXT,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doctors_specialization_name ON doctors (specialization, name, doctor_id);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    appointment_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    doctor_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS appointments_booked_slot
+    ON appointments (doctor_id, date, time) WHERE status = 'booked';
+CREATE INDEX IF NOT EXISTS appointments_user_date ON appointments (user_id, date, appointment_id);
+
+CREATE TABLE IF NOT EXISTS waitlist (
+    seq INTEGER PRIMARY KEY,
+    doctor_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    UNIQUE (doctor_id, date, time, user_id)
+);
+CREATE INDEX IF NOT EXISTS waitlist_slot ON waitlist (doctor_id, date, time, seq);
+'''
+
+
+def _load(row):
+    return json.loads(row[0]) if row else None
+
+
+class SQLiteRepository(Repository):
+    """Storage in a single SQLite database file"""
+
+    name = 'SQLite'
+
+    def __init__(self, path, synchronous=SQLITE_SYNCHRONOUS, busy_timeout=SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    # ----------------------------------------
+    # Connections and transactions
+    # ----------------------------------------
+
+    def _connection(self):
+        """This thread's connection, opened on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # Autocommit mode; transactions are opened explicitly below
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute(f'PRAGMA synchronous = {self.synchronous}')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """
+        A write transaction holding the database's write lock from the
+        start, so nothing changes between its reads and its writes
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def close(self):
+        """Close the calling thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _query_one(self, sql, params=()):
+        return _load(self._connection().execute(sql, params).fetchone())
+
+    def _query_all(self, sql, params=()):
+        return [json.loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    @staticmethod
+    def _insert_appointment(connection, appointment):
+        connection.execute(
+            'INSERT INTO appointments (appointment_id, user_id, doctor_id, date, time, status, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (appointment['appointment_id'], appointment['user_id'], appointment['doctor_id'],
+             appointment['date'], appointment['time'], appointment['status'], json.dumps(appointment))
+        )
+
+    @staticmethod
+    def _update_appointment(connection, appointment):
+        connection.execute(
+            'UPDATE appointments SET date = ?, time = ?, status = ?, data = ? WHERE appointment_id = ?',
+            (appointment['date'], appointment['time'], appointment['status'], json.dumps(appointment),
+             appointment['appointment_id'])
+        )
+
+    # ----------------------------------------
+    # Users
+    # ----------------------------------------
+
+    def get_user(self, user_id):
+        return self._query_one('SELECT data FROM users WHERE user_id = ?', (user_id,))
+
+    def find_user_by_email(self, email):
+        return self._query_one('SELECT data FROM users WHERE email = ?', (email,))
+
+    def add_user(self, user):
+        """The unique index on email rejects a second registration"""
+        try:
+            self._connection().execute(
+                'INSERT INTO users (user_id, email, data) VALUES (?, ?, ?)',
+                (user['user_id'], user['email'], json.dumps(user))
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def update_password_hash(self, user_id, old_hash, new_hash):
+        with self._transaction() as connection:
+            user = _load(connection.execute('SELECT data FROM users WHERE user_id = ?', (user_id,)).fetchone())
+            if not user or user['password_hash'] != old_hash:
+                return False
+            connection.execute('UPDATE users SET data = ? WHERE user_id = ?',
+                               (json.dumps({**user, 'password_hash': new_hash}), user_id))
+            return True
+
+    # ----------------------------------------
+    # Doctors
+    # ----------------------------------------
+
+    def list_doctors(self):
+        return self._query_all('SELECT data FROM doctors ORDER BY doctor_id')
+
+    def get_doctor(self, doctor_id):
+        return self._query_one('SELECT data FROM doctors WHERE doctor_id = ?', (doctor_id,))
+
+    def get_doctors(self, doctor_ids):
+        doctor_ids = list(set(doctor_ids))
+        doctors = {}
+        for start in range(0, len(doctor_ids), MAX_VARIABLES):
+            chunk = doctor_ids[start:start + MAX_VARIABLES]
+            for doctor in self._query_all(
+                    f"SELECT data FROM doctors WHERE doctor_id IN ({', '.join('?' * len(chunk))})", chunk):
+                doctors[doctor['doctor_id']] = doctor
+        return doctors
+
+    def search_doctors(self, specialization=None, name_prefix=None, limit=20, start_key=None):
+        """
+        With a specialization this is a range scan of the
+        (specialization, name, doctor_id) index; otherwise doctors are read
+        in doctor_id order. Pages resume after start_key (keyset pagination).
+        """
+        conditions, params = [], []
+        if name_prefix:
+            # Every name starting with the prefix sorts in this range
+            conditions.append('name >= ? AND name < ?')
+            params += [name_prefix, name_prefix + '\U0010ffff']
+        if specialization:
+            conditions.insert(0, 'specialization = ?')
+            params.insert(0, specialization)
+            if start_key:
+                if not isinstance(start_key, dict) or \
+                        set(start_key) != {'doctor_id', 'specialization', 'name'} or \
+                        start_key['specialization'] != specialization:
+                    raise ValueError('Invalid cursor')
+                conditions.append('(name > ? OR (name = ? AND doctor_id > ?))')
+                params += [start_key['name'], start_key['name'], start_key['doctor_id']]
+            order = 'name, doctor_id'
+            key_fields = ('doctor_id', 'specialization', 'name')
+        else:
+            if start_key:
+                if not isinstance(start_key, dict) or set(start_key) != {'doctor_id'}:
+                    raise ValueError('Invalid cursor')
+                conditions.append('doctor_id > ?')
+                params.append(start_key['doctor_id'])
+            order = 'doctor_id'
+            key_fields = ('doctor_id',)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        page = self._query_all(f'SELECT data FROM doctors {where} ORDER BY {order} LIMIT ?',
+                               params + [limit + 1])
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        return page, {field: page[-1][field] for field in key_fields}
+
+    def put_doctors(self, doctors):
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO doctors (doctor_id, specialization, name, data) VALUES (?, ?, ?, ?)',
+                [(doctor['doctor_id'], doctor.get('specialization'), doctor.get('name'), json.dumps(doctor))
+                 for doctor in doctors]
+            )
+        return len(doctors)
+
+    # ----------------------------------------
+    # Appointments and slots
+    # ----------------------------------------
+
+    def get_appointment(self, appointment_id):
+        return self._query_one('SELECT data FROM appointments WHERE appointment_id = ?', (appointment_id,))
+
+    def get_reservation(self, doctor_id, date, time):
+        """The booked appointment holding a slot (None if the slot is free)"""
+        return self._query_one(
+            "SELECT data FROM appointments WHERE doctor_id = ? AND date = ? AND time = ? AND status = 'booked'",
+            (doctor_id, date, time)
+        )
+
+    def add_appointment(self, appointment):
+        """The partial unique index on booked slots rejects a double booking"""
+        try:
+            self._insert_appointment(self._connection(), appointment)
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def add_appointments(self, appointments):
+        """All bookings are inserted in one transaction (one commit)"""
+        failures = {}
+        with self._transaction() as connection:
+            for appointment in appointments:
+                try:
+                    self._insert_appointment(connection, appointment)
+                except sqlite3.IntegrityError:
+                    failures[appointment['appointment_id']] = 409
+        return failures
+
+    def cancel_appointment(self, appointment):
+        with self._transaction() as connection:
+            current = _load(connection.execute(
+                'SELECT data FROM appointments WHERE appointment_id = ?',
+                (appointment['appointment_id'],)).fetchone())
+            if current != appointment:
+                return None
+            cancelled = {**appointment, 'status': 'cancelled', 'cancelled_at': datetime.now().isoformat()}
+            self._update_appointment(connection, cancelled)
+            return cancelled
+
+    def reschedule_appointment(self, appointment, new_date, new_time):
+        """The old slot leaves the booked-slot index in the same update that claims the new one"""
+        with self._transaction() as connection:
+            current = _load(connection.execute(
+                'SELECT data FROM appointments WHERE appointment_id = ?',
+                (appointment['appointment_id'],)).fetchone())
+            if current != appointment:
+                return None
+            moved = {**appointment, 'date': new_date, 'time': new_time,
+                     'rescheduled_at': datetime.now().isoformat()}
+            try:
+                self._update_appointment(connection, moved)
+            except sqlite3.IntegrityError:
+                return None
+            return moved
+
+    def list_user_appointments(self, user_id, when=None, limit=20, start_key=None):
+        """
+        A range scan of the (user_id, date, appointment_id) index; pages
+        resume after start_key (keyset pagination)
+        """
+        today = datetime.now().date().isoformat()
+        conditions, params = ['user_id = ?'], [user_id]
+        if when == 'upcoming':
+            conditions += ['date >= ?', "status = 'booked'"]
+            params.append(today)
+        elif when == 'past':
+            conditions.append('date < ?')
+            params.append(today)
+
+        if start_key:
+            if not isinstance(start_key, dict) or \
+                    set(start_key) != {'appointment_id', 'user_id', 'date'} or \
+                    start_key['user_id'] != user_id or \
+                    (when == 'upcoming' and start_key['date'] < today) or \
+                    (when == 'past' and start_key['date'] >= today):
+                raise ValueError('Invalid cursor')
+            after = '>' if when == 'upcoming' else '<'
+            conditions.append(f'(date {after} ? OR (date = ? AND appointment_id {after} ?))')
+            params += [start_key['date'], start_key['date'], start_key['appointment_id']]
+
+        direction = 'ASC' if when == 'upcoming' else 'DESC'
+        page = self._query_all(
+            f"SELECT data FROM appointments WHERE {' AND '.join(conditions)} "
+            f"ORDER BY date {direction}, appointment_id {direction} LIMIT ?",
+            params + [limit + 1]
+        )
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        return page, {field: page[-1][field] for field in ('appointment_id', 'user_id', 'date')}
+
+    def list_doctor_schedule(self, doctor_id, dates, limit=20, start_key=None):
+        """A range scan of the booked-slot index"""
+        low, high = f"{dates[0]}#", f"{dates[-1]}#~"
+        conditions = ["doctor_id = ?", "status = 'booked'", "date >= ?", "date <= ?"]
+        params = [doctor_id, dates[0], dates[-1]]
+        if start_key:
+            if not isinstance(start_key, dict) or set(start_key) != {'doctor_id', 'slot'} or \
+                    start_key['doctor_id'] != doctor_id or not isinstance(start_key['slot'], str) or \
+                    not low <= start_key['slot'] <= high:
+                raise ValueError('Invalid cursor')
+            start_date, _, start_time = start_key['slot'].partition('#')
+            conditions.append('(date > ? OR (date = ? AND time > ?))')
+            params += [start_date, start_date, start_time]
+
+        rows = self._connection().execute(
+            f"SELECT date, time, appointment_id, user_id FROM appointments "
+            f"WHERE {' AND '.join(conditions)} ORDER BY date, time LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        schedule = [
+            {'date': date, 'time': time, 'appointment_id': appointment_id, 'user_id': user_id}
+            for date, time, appointment_id, user_id in rows[:limit]
+        ]
+        if len(rows) <= limit:
+            return schedule, None
+        return schedule, {'doctor_id': doctor_id, 'slot': f"{schedule[-1]['date']}#{schedule[-1]['time']}"}
+
+    def get_occupancy(self, doctor_id, dates):
+        booked = {date: [] for date in dates}
+        rows = self._connection().execute(
+            "SELECT date, time FROM appointments "
+            "WHERE doctor_id = ? AND status = 'booked' AND date >= ? AND date <= ?",
+            (doctor_id, dates[0], dates[-1])
+        )
+        for date, time in rows:
+            if date in booked:
+                booked[date].append(time)
+        return {date: occupancy_bitmap(times) for date, times in booked.items()}
+
+    # ----------------------------------------
+    # Waitlists
+    # ----------------------------------------
+    # One row per waiting user; seq keeps them in the order they joined.
+
+    def get_waitlist(self, doctor_id, date, time):
+        rows = self._connection().execute(
+            'SELECT user_id FROM waitlist WHERE doctor_id = ? AND date = ? AND time = ? ORDER BY seq',
+            (doctor_id, date, time)
+        )
+        return [user_id for user_id, in rows]
+
+    def join_waitlist(self, doctor_id, date, time, user_id):
+        with self._transaction() as connection:
+            length, = connection.execute(
+                'SELECT COUNT(*) FROM waitlist WHERE doctor_id = ? AND date = ? AND time = ?',
+                (doctor_id, date, time)).fetchone()
+            if length >= MAX_WAITLIST_LENGTH:
+                return None
+            try:
+                connection.execute(
+                    'INSERT INTO waitlist (doctor_id, date, time, user_id) VALUES (?, ?, ?, ?)',
+                    (doctor_id, date, time, user_id))
+            except sqlite3.IntegrityError:
+                return None
+            return length + 1
+
+    def leave_waitlist(self, doctor_id, date, time, user_id):
+        cursor = self._connection().execute(
+            'DELETE FROM waitlist WHERE doctor_id = ? AND date = ? AND time = ? AND user_id = ?',
+            (doctor_id, date, time, user_id))
+        return cursor.rowcount > 0
+
+    def promote_waitlist(self, doctor_id, date, time):
+        with self._transaction() as connection:
+            if connection.execute(
+                    "SELECT 1 FROM appointments "
+                    "WHERE doctor_id = ? AND date = ? AND time = ? AND status = 'booked'",
+                    (doctor_id, date, time)).fetchone():
+                return None
+            while True:
+                head = connection.execute(
+                    'SELECT seq, user_id FROM waitlist WHERE doctor_id = ? AND date = ? AND time = ? '
+                    'ORDER BY seq LIMIT 1',
+                    (doctor_id, date, time)).fetchone()
+                if not head:
+                    return None
+                seq, user_id = head
+                connection.execute('DELETE FROM waitlist WHERE seq = ?', (seq,))
+                if connection.execute('SELECT 1 FROM users WHERE user_id = ?', (user_id,)).fetchone():
+                    break
+
+            appointment = {
+                'appointment_id': str(uuid.uuid4()),
+                'user_id': user_id,
+                'doctor_id': doctor_id,
+                'date': date,
+                'time': time,
+                'status': 'booked',
+                'created_at': datetime.now().isoformat(),
+                'source': 'waitlist'
+            }
+            self._insert_appointment(connection, appointment)
+            return appointment
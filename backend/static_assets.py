@@ -0,0 +1,59 @@
+"""
+Serving the frontend files
+
+Files with a content hash in their name (built by build_assets.py) never
+change, so they are cached for a year without revalidation. Everything
+else (the HTML pages, or an unbuilt frontend/) is revalidated on each use,
+which costs a 304 when nothing changed. Precompressed .br and .gz copies
+are sent to clients that accept them.
+
+A web server in front of the app (e.g. nginx with gzip_static) can serve
+frontend/dist/ the same way without involving the Python workers.
+"""
+
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+# name.<10 hex digits>.ext, as written by build_assets.py
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{10}\.[A-Za-z0-9]+$')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Precompressed copies, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+mimetypes.add_type('image/webp', '.webp')
+
+
+def register_frontend(app, frontend_dir):
+    """Serve frontend_dir at / (index.html) and /<file>"""
+    app.add_url_rule('/', 'home', lambda: send_frontend_file(frontend_dir, 'index.html'))
+    app.add_url_rule('/<path:filename>', 'frontend',
+                     lambda filename: send_frontend_file(frontend_dir, filename))
+
+
+def send_frontend_file(frontend_dir, filename):
+    """Send a frontend file, precompressed if possible, with its caching headers"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    available = [(encoding, suffix) for encoding, suffix in ENCODINGS
+                 if os.path.isfile(safe_join(frontend_dir, filename + suffix) or '')]
+    accepted = next(((encoding, suffix) for encoding, suffix in available
+                     if request.accept_encodings[encoding]), None)
+
+    if accepted:
+        encoding, suffix = accepted
+        response = send_from_directory(frontend_dir, filename + suffix, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(frontend_dir, filename, mimetype=mimetype)
+    if available:
+        # Caches must keep the compressed and plain versions apart
+        response.vary.add('Accept-Encoding')
+
+    response.headers['Cache-Control'] = IMMUTABLE if FINGERPRINTED.search(filename) else REVALIDATE
+    return response
@@ -0,0 +1,23 @@
+from application import create_app
+from local_store import MemoryStore
+from notifications import MemoryTransport
+
+
+def test_proxied_requests_without_trusted_proxy_count_warn_once(capsys):
+    app = create_app(MemoryStore(), MemoryTransport())
+    client = app.test_client()
+    capsys.readouterr()
+
+    for _ in range(2):
+        client.post('/login', json={'email': 'pat@example.com', 'password': 'wrong'},
+                    headers={'X-Forwarded-For': '203.0.113.7'})
+    assert capsys.readouterr().out.count('TRUSTED_PROXY_COUNT is not set') == 1
+    app.extensions['care4u'].stop()
+
+
+def test_direct_requests_do_not_warn(capsys):
+    app = create_app(MemoryStore(), MemoryTransport())
+    client = app.test_client()
+    client.post('/login', json={'email': 'pat@example.com', 'password': 'wrong'})
+    assert 'TRUSTED_PROXY_COUNT' not in capsys.readouterr().out
+    app.extensions['care4u'].stop()
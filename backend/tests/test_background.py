@@ -0,0 +1,49 @@
+import threading
+import time
+
+from background import BackgroundWorkers
+
+
+class Recorder(BackgroundWorkers):
+    """Records processed items; each batch waits until `release` is set"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.processed = []
+        self.release = threading.Event()
+
+    def add(self, item):
+        self._ensure_started()
+        self._queue.put_nowait(item)
+
+    def process(self, batch):
+        self.release.wait()
+        self.processed.extend(batch)
+
+
+def test_stop_processes_queued_items():
+    workers = Recorder(workers=2, batch_size=3)
+    workers.release.set()
+    for item in range(10):
+        workers.add(item)
+    workers.stop()
+    assert sorted(workers.processed) == list(range(10))
+    assert not any(worker.is_alive() for worker in workers._workers)
+
+
+def test_stop_returns_on_time_with_a_full_queue():
+    workers = Recorder(workers=1, max_queue_size=3)
+    workers.add(0)
+    # The worker takes item 0 and waits; the next three fill the queue
+    time.sleep(0.05)
+    for item in (1, 2, 3):
+        workers.add(item)
+
+    started = time.monotonic()
+    workers.stop(timeout=0.3)
+    assert time.monotonic() - started < 1
+
+    # Once processing resumes, the queued items are still worked through
+    workers.release.set()
+    time.sleep(0.2)
+    assert workers.processed == [0, 1, 2, 3]
@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+from local_store import LocalStore
+
+
+def user(index):
+    return {'user_id': f'user-{index}', 'name': f'User {index}', 'email': f'user{index}@example.com',
+            'phone': '5550000000', 'password_hash': 'hash'}
+
+
+def journal_record(item):
+    return json.dumps({'collection': 'users', 'item': item}) + '\n'
+
+
+def test_creates_missing_data_dir(tmp_path):
+    data_dir = tmp_path / 'fresh' / 'local_data'
+    store = LocalStore(str(data_dir))
+    assert store.add_user(user(1))
+    assert LocalStore(str(data_dir)).get_user('user-1')['email'] == 'user1@example.com'
+
+
+def test_replay_ignores_torn_last_record(tmp_path):
+    with open(tmp_path / 'journal.log', 'w') as f:
+        f.write(journal_record(user(1)))
+        f.write(journal_record(user(2))[:-20])
+
+    store = LocalStore(str(tmp_path))
+    assert store.get_user('user-1')
+    assert store.get_user('user-2') is None
+
+    # The next write replaces the torn record
+    assert store.add_user(user(3))
+    reloaded = LocalStore(str(tmp_path))
+    assert reloaded.get_user('user-1') and reloaded.get_user('user-3')
+
+
+def test_replay_refuses_corrupt_record(tmp_path):
+    with open(tmp_path / 'journal.log', 'w') as f:
+        f.write(journal_record(user(1)))
+        f.write('{"collection": "users", "item": {"user_id"\n')
+        f.write(journal_record(user(2)))
+    size = os.path.getsize(tmp_path / 'journal.log')
+
+    with pytest.raises(ValueError, match='Corrupt journal record'):
+        LocalStore(str(tmp_path))
+    assert os.path.getsize(tmp_path / 'journal.log') == size
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from metrics import Metrics, record_consumed_capacity
+
+GET_ITEM = SimpleNamespace(name='GetItem')
+
+
+def consume(units):
+    record_consumed_capacity({'ConsumedCapacity': {'TableName': 'Care4U_Users', 'CapacityUnits': units}},
+                             GET_ITEM)
+
+
+def capacity(metrics):
+    return [line for line in metrics.render().splitlines()
+            if line.startswith('care4u_dynamodb_consumed_capacity_total{')]
+
+
+def test_capacity_goes_to_the_registry_that_made_the_call():
+    first, second = Metrics(), Metrics()
+    with first.timed('storage', 'get_user'):
+        consume(1)
+    with second.timed('storage', 'get_user'):
+        consume(0.5)
+        with first.timed('notifications', 'send'):
+            consume(2)
+        consume(0.5)
+    consume(10)
+
+    assert capacity(first) == ['care4u_dynamodb_consumed_capacity_total{table="Care4U_Users",operation="GetItem"} 3']
+    assert capacity(second) == ['care4u_dynamodb_consumed_capacity_total{table="Care4U_Users",operation="GetItem"} 1']
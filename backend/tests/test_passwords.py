@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from application import create_app
+from local_store import MemoryStore
+from notifications import MemoryTransport
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=1, timeout=5)
+    yield hasher
+    hasher.shutdown()
+
+
+def occupy(hasher, seconds):
+    """Run a slow job in the pool on a background thread; returns the thread"""
+    thread = threading.Thread(target=hasher._run, args=(time.sleep, seconds))
+    thread.start()
+    time.sleep(0.2)
+    return thread
+
+
+def test_full_pool_answers_busy_at_once(hasher):
+    hasher.start()
+    thread = occupy(hasher, 1)
+
+    started = time.monotonic()
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('secret')
+    assert time.monotonic() - started < 0.1
+
+    thread.join()
+    assert hasher.verify(hasher.hash('secret'), 'secret') == (True, None)
+
+
+def test_timed_out_hash_keeps_its_slot_until_done(hasher):
+    hasher.start()
+    hasher.timeout = 0.1
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run(time.sleep, 0.5)
+    # Still running in the pool, so still counted
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('secret')
+
+    time.sleep(0.6)
+    hasher.timeout = 5
+    assert hasher.hash('secret')
+    # Every slot is back
+    assert hasher._slots._value == hasher.max_pending
+
+
+def test_signup_answers_503_while_hashing_is_saturated(hasher):
+    app = create_app(MemoryStore(), MemoryTransport())
+    services = app.extensions['care4u']
+    services.password_hasher = hasher
+    client = app.test_client()
+    hasher.start()
+    thread = occupy(hasher, 1)
+
+    started = time.monotonic()
+    response = client.post('/signup', json={'name': 'Pat', 'email': 'pat@example.com',
+                                            'phone': '5550000000', 'password': 'secret'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert time.monotonic() - started < 0.5
+
+    thread.join()
+    response = client.post('/signup', json={'name': 'Pat', 'email': 'pat@example.com',
+                                            'phone': '5550000000', 'password': 'secret'})
+    assert response.status_code == 201
+    services.stop()
@@ -0,0 +1,31 @@
+import pytest
+
+from application import create_app
+from local_store import MemoryStore
+from notifications import MemoryTransport
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / 'index.html').write_text('<html></html>')
+    app = create_app(MemoryStore(), MemoryTransport(), frontend_dir=str(tmp_path))
+    yield app.test_client()
+    app.extensions['care4u'].stop()
+
+
+def test_unknown_endpoint_is_a_json_404_for_any_method(client):
+    for response in (client.post('/api/unknown', json={}), client.delete('/no-such-endpoint'),
+                     client.get('/no-such-file.js')):
+        assert response.status_code == 404
+        assert response.get_json() == {'success': False, 'error': 'Endpoint not found'}
+
+
+def test_wrong_method_on_an_endpoint_is_a_json_405(client):
+    response = client.delete('/doctors')
+    assert response.status_code == 405
+    assert response.get_json() == {'success': False, 'error': 'Method not allowed'}
+    assert 'GET' in response.headers['Allow']
+
+
+def test_frontend_files_are_still_served(client):
+    assert client.get('/index.html').status_code == 200
@@ -0,0 +1,76 @@
+"""
+Waitlist promotion worker shared by app.py and app_local.py
+
+Each (doctor, date, time) slot can have a waitlist: a FIFO list of
+user_ids stored with the slot (one item per slot in DynamoDB, one record
+per slot in the local store). When a booked slot is released by a
+cancellation or a reschedule, the request handler schedules the slot here
+and returns; a background thread then books it for the first user on the
+waitlist and sends them a notification. Failed promotions are retried with
+exponential backoff.
+"""
+
+import os
+import time
+
+from background import BackgroundWorkers
+
+# Longest waitlist kept for a single slot
+MAX_WAITLIST_LENGTH = int(os.environ.get('MAX_WAITLIST_LENGTH', '100'))
+
+
+def waitlist_position(user_ids, user_id):
+    """1-based position of a user on a waitlist (None if not on it)"""
+    try:
+        return user_ids.index(user_id) + 1
+    except ValueError:
+        return None
+
+
+class WaitlistPromoter(BackgroundWorkers):
+    """
+    Promote waitlisted users into released slots on a worker thread.
+    `promote(doctor_id, date, time)` books the slot for the next user on
+    its waitlist (or does nothing if there is nobody, or the slot has been
+    taken again). See background.py for the worker lifecycle.
+    """
+
+    thread_name = 'waitlist'
+    unfinished_message = 'released slots not offered to their waitlists'
+
+    def __init__(self, promote, workers=1, max_attempts=5, base_delay=0.5, max_delay=30):
+        super().__init__(workers=workers, max_attempts=max_attempts, base_delay=base_delay,
+                         max_delay=max_delay)
+        self.promote = promote
+        self._scheduled = set()
+
+    def schedule(self, doctor_id, date, time):
+        """Queue a released slot for promotion (no-op if already queued)"""
+        self._ensure_started()
+        slot = (doctor_id, date, time)
+        with self._lock:
+            if slot in self._scheduled:
+                return
+            self._scheduled.add(slot)
+        self._queue.put(slot)
+
+    def _reset(self):
+        self._scheduled = set()
+
+    def process(self, batch):
+        for slot in batch:
+            with self._lock:
+                self._scheduled.discard(slot)
+            self._promote(slot)
+
+    def _promote(self, slot):
+        """Run one promotion, retrying errors with exponential backoff"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.promote(*slot)
+                return
+            except Exception as e:
+                print(f"Waitlist promotion error for {slot}: {str(e)}")
+            if attempt < self.max_attempts:
+                time.sleep(self.retry_delay(attempt))
+        print(f"Waitlist promotion gave up after {self.max_attempts} attempts: {slot}")
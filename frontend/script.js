@@ -16,7 +16,7 @@ const API_BASE_URL = 'http://100.27.210.130:5000';
  * @returns {boolean}
  */
 function isAuthenticated() {
-    return localStorage.getItem('user_id') !== null;
+    return localStorage.getItem('session_token') !== null;
 }
 
 /**
@@ -155,6 +155,12 @@ async function apiRequest(endpoint, method = 'GET', data = null) {
         }
     };
 
+    // Send the session token from /login, if any
+    const token = localStorage.getItem('session_token');
+    if (token) {
+        options.headers['Authorization'] = `Bearer ${token}`;
+    }
+
     if (data && method !== 'GET') {
         options.body = JSON.stringify(data);
     }
@@ -196,15 +202,61 @@ async function getDoctors() {
     return await apiRequest('/doctors', 'GET');
 }
 
+/**
+ * Get free time slots for a doctor
+ * @param {string} doctorId
+ * @param {string} date - Date in YYYY-MM-DD format
+ * @returns {Promise<Object>}
+ */
+async function getAvailability(doctorId, date) {
+    return await apiRequest(`/doctors/${encodeURIComponent(doctorId)}/availability?date=${date}`, 'GET');
+}
+
 /**
  * Book appointment
- * @param {Object} appointmentData - {user_id, doctor_id, date, time}
+ * @param {Object} appointmentData - {doctor_id, date, time}
  * @returns {Promise<Object>}
  */
 async function bookAppointment(appointmentData) {
     return await apiRequest('/book-appointment', 'POST', appointmentData);
 }
 
+/**
+ * Join the waitlist of a booked slot
+ * @param {string} doctorId
+ * @param {string} date - Date in YYYY-MM-DD format
+ * @param {string} time - Time in HH:MM format
+ * @returns {Promise<Object>} {position} on success
+ */
+async function joinWaitlist(doctorId, date, time) {
+    return await apiRequest('/waitlist', 'POST', { doctor_id: doctorId, date, time });
+}
+
+/**
+ * Get a user's appointments
+ * @param {string} userId
+ * @param {Object} options - {when: 'upcoming'|'past', limit, cursor} (all optional)
+ * @returns {Promise<Object>} {appointments, next_cursor}
+ */
+async function getUserAppointments(userId, options = {}) {
+    const params = new URLSearchParams();
+    Object.entries(options).forEach(([key, value]) => {
+        if (value) {
+            params.set(key, value);
+        }
+    });
+    return await apiRequest(`/users/${encodeURIComponent(userId)}/appointments?${params}`, 'GET');
+}
+
+/**
+ * Cancel an appointment
+ * @param {string} appointmentId
+ * @returns {Promise<Object>}
+ */
+async function cancelAppointment(appointmentId) {
+    return await apiRequest(`/appointments/${encodeURIComponent(appointmentId)}/cancel`, 'POST');
+}
+
 // ============================================
 // INITIALIZATION
 // ============================================
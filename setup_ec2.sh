@@ -21,7 +21,7 @@ sudo yum install python3-pip -y
 
 # Install required Python packages
 echo "📚 Installing Python dependencies..."
-pip3 install flask flask-cors boto3 werkzeug
+pip3 install flask flask-cors boto3 werkzeug gunicorn
 
 # Verify installations
 echo ""
@@ -40,7 +40,8 @@ echo "   export SNS_TOPIC_ARN='arn:aws:sns:REGION:ACCOUNT_ID:Care4U_Appointments
 echo ""
 echo "2. Run the application:"
 echo "   cd backend"
-echo "   python3 app.py"
+echo "   gunicorn -c gunicorn.conf.py"
+echo "   (behind nginx or a load balancer, first: export TRUSTED_PROXY_COUNT=1)"
 echo ""
 echo "3. Access the application:"
 echo "   http://YOUR_EC2_PUBLIC_IP:5000"